@@ -0,0 +1,192 @@
+"""
+Control de admisión de archivos subidos
+Antes de leer un archivo se comprueba su tamaño según el plan, el tamaño
+descomprimido de los .xlsx (directorio central del zip) y la memoria
+estimada a partir de una muestra; los que no caben se rechazan o, si son
+CSV, se limpian por bloques
+"""
+
+import os
+import threading
+import zipfile
+from contextlib import contextmanager
+from io import BytesIO
+
+import pandas as pd
+
+import ingest
+
+# Tamaño descomprimido máximo de un .xlsx (EXCEL_XLSX_MAX_UNCOMPRESSED_MB)
+XLSX_MAX_UNCOMPRESSED_MB = int(os.environ.get('EXCEL_XLSX_MAX_UNCOMPRESSED_MB', '1024'))
+
+# Relación de compresión a partir de la cual un .xlsx se considera una bomba zip
+XLSX_MAX_RATIO = int(os.environ.get('EXCEL_XLSX_MAX_RATIO', '100'))
+
+# Bytes iniciales de un CSV que se leen para estimar la memoria
+SAMPLE_BYTES = 1024 * 1024
+
+# Filas de la primera hoja de un .xlsx que se leen para estimar la memoria
+SAMPLE_ROWS = 2000
+
+# Pico del pipeline respecto al DataFrame leído (lectura, copia limpia, perfil)
+PEAK_FACTOR = 3.0
+
+# Memoria total para archivos en proceso en este worker (EXCEL_MEMORY_BUDGET_MB)
+PROCESS_BUDGET_MB = int(os.environ.get('EXCEL_MEMORY_BUDGET_MB', '4096'))
+
+ACCEPT, STREAM, REJECT = 'accept', 'stream', 'reject'
+
+
+class BudgetExceeded(RuntimeError):
+    """No queda memoria en el presupuesto del proceso para otro archivo"""
+
+
+def xlsx_uncompressed(data):
+    """
+    Tamaño descomprimido de un .xlsx leyendo solo el directorio central del zip
+
+    Returns:
+        tuple: (bytes descomprimidos, relación de compresión)
+    """
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        members = archive.infolist()
+    uncompressed = sum(info.file_size for info in members)
+    compressed = sum(info.compress_size for info in members)
+    return uncompressed, uncompressed / max(compressed, 1)
+
+
+def _frame_mb(df):
+    return float(df.memory_usage(index=True, deep=True).sum()) / 1024 ** 2
+
+
+def estimate_csv_mb(data, sample_bytes=SAMPLE_BYTES):
+    """Memoria del DataFrame completo extrapolada desde las primeras líneas del CSV"""
+    if len(data) <= sample_bytes:
+        sample = data
+    else:
+        sample = data[:data.rfind(b'\n', 0, sample_bytes) + 1] or data[:sample_bytes]
+    df, _ = ingest.read_csv(sample, engine='c')
+    return _frame_mb(df) * len(data) / max(len(sample), 1)
+
+
+def estimate_xlsx_mb(data, sample_rows=SAMPLE_ROWS):
+    """
+    Memoria de la primera hoja extrapolada desde sus primeras filas
+
+    Usa openpyxl en modo read_only: solo se recorren las filas de la muestra
+    y el total de filas sale de la dimensión declarada en la hoja.
+    """
+    import openpyxl
+    workbook = openpyxl.load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = sheet.max_row
+        rows = list(sheet.iter_rows(max_row=sample_rows + 1, values_only=True))
+    finally:
+        workbook.close()
+    if len(rows) < 2:
+        return 0.0
+    df = pd.DataFrame(rows[1:], columns=[str(c) for c in rows[0]])
+    if not total_rows or total_rows < len(rows):
+        # Sin dimensión declarada: se supone que la muestra es todo el archivo
+        total_rows = len(rows)
+    return _frame_mb(df) * (total_rows - 1) / len(df)
+
+
+class MemoryBudget:
+    """
+    Memoria estimada de los archivos que se están procesando en el proceso
+
+    La comprobación y la reserva son una sola operación bajo el lock, así que
+    varias subidas concurrentes no pueden pasar todas la comprobación y
+    superar juntas el límite.
+    """
+
+    def __init__(self, limit_mb=PROCESS_BUDGET_MB):
+        self.limit_mb = limit_mb
+        self.in_use_mb = 0.0
+        self._lock = threading.Lock()
+
+    def available_mb(self):
+        with self._lock:
+            return self.limit_mb - self.in_use_mb
+
+    def try_reserve(self, mb):
+        """Reserva mb si caben en el límite; devuelve False si no"""
+        with self._lock:
+            if self.in_use_mb + mb > self.limit_mb:
+                return False
+            self.in_use_mb += mb
+            return True
+
+    def release(self, mb):
+        with self._lock:
+            self.in_use_mb -= mb
+
+    @contextmanager
+    def hold(self, mb):
+        """Reserva mb mientras dura el bloque; lanza BudgetExceeded si no caben"""
+        if not self.try_reserve(mb):
+            raise BudgetExceeded("El servidor está procesando muchos archivos; inténtalo en unos segundos")
+        try:
+            yield
+        finally:
+            self.release(mb)
+
+
+_budget = MemoryBudget()
+
+
+def get_budget():
+    return _budget
+
+
+def admit(data, file_name, limits):
+    """
+    Decide si un archivo se procesa en memoria, por bloques o se rechaza
+
+    La decisión depende solo del archivo y del plan, así que se puede guardar;
+    el presupuesto del proceso se reserva al procesar (MemoryBudget.hold).
+
+    Args:
+        limits: límites del plan (auth.TIER_LIMITS[tier]) con max_file_size_mb y max_memory_mb
+
+    Returns:
+        dict: {'action': 'accept'|'stream'|'reject', 'reason', 'size_mb', 'estimated_mb'}
+    """
+    name = file_name.lower()
+    size_mb = len(data) / 1024 ** 2
+    decision = {'action': ACCEPT, 'reason': None, 'size_mb': round(size_mb, 2), 'estimated_mb': None}
+
+    def reject(reason):
+        decision.update(action=REJECT, reason=reason)
+        return decision
+
+    if size_mb > limits['max_file_size_mb']:
+        return reject(f"El archivo pesa {size_mb:.1f} MB y tu plan admite hasta {limits['max_file_size_mb']} MB")
+
+    try:
+        if name.endswith('.xlsx'):
+            uncompressed, ratio = xlsx_uncompressed(data)
+            if uncompressed > XLSX_MAX_UNCOMPRESSED_MB * 1024 ** 2 or ratio > XLSX_MAX_RATIO:
+                return reject(f"El Excel se descomprime a {uncompressed / 1024 ** 2:,.0f} MB (x{ratio:.0f}); no se puede procesar")
+            frame_mb = estimate_xlsx_mb(data)
+        elif name.endswith('.csv'):
+            frame_mb = estimate_csv_mb(data)
+        else:
+            # .xls: formato binario limitado a 65.536 filas
+            frame_mb = size_mb
+    except zipfile.BadZipFile:
+        return reject("El archivo .xlsx está dañado o no es un Excel válido")
+    except Exception:
+        # Si la muestra no se puede leer, el error se mostrará al procesar el archivo
+        frame_mb = size_mb
+
+    estimated_mb = frame_mb * PEAK_FACTOR
+    decision['estimated_mb'] = round(estimated_mb, 1)
+    if estimated_mb <= limits['max_memory_mb']:
+        return decision
+    if name.endswith('.csv'):
+        decision.update(action=STREAM, reason="Se procesará por bloques para no agotar la memoria")
+        return decision
+    return reject(f"Se estiman {estimated_mb:,.0f} MB de memoria y tu plan admite {limits['max_memory_mb']} MB")
@@ -3,20 +3,27 @@ Sistema de Autenticación y Licencias - Excel Automator Pro
 Versión: 2.6 - Con persistencia real usando query params
 """
 
+import hashlib
+import secrets
+
 import streamlit as st
-from datetime import datetime
+
+import metering
+import session_tokens
 
 # LÍMITES POR TIER
 TIER_LIMITS = {
     'free': {
         'daily_analyses': 3,
         'max_file_size_mb': 5,
+        'max_memory_mb': 256,
         'features': ['básico', 'gráficos_simples'],
         'name': '🆓 Gratis'
     },
     'premium': {
         'daily_analyses': 999999,
         'max_file_size_mb': 50,
+        'max_memory_mb': 2048,
         'features': ['básico', 'gráficos_simples', 'gráficos_avanzados', 'exportar_pdf'],
         'name': '💎 Premium'
     }
@@ -36,10 +43,33 @@ def initialize_session():
     # PASO 1: Intentar restaurar sesión desde URL
     try:
         query_params = st.query_params
+        saved_token = query_params.get('s', None)
         saved_code = query_params.get('code', None)
         
-        # Si hay código en URL y no estamos autenticados, validar
-        if saved_code and not st.session_state.get('authenticated', False):
+        # Token firmado: la firma y la revocación se verifican localmente, sin
+        # esperar a Firestore; la licencia se comprueba con refresh_license()
+        if saved_token:
+            if not st.session_state.get('authenticated', False):
+                session = session_tokens.verify(saved_token)
+                if session:
+                    st.session_state.authenticated = True
+                    st.session_state.user_tier = session['tier']
+                    st.session_state.user_email = ''
+                    st.session_state.license_code = session['code']
+                    st.session_state.expires = session['lic_exp']
+                    st.session_state.customer_name = 'Usuario Premium'
+                    st.session_state.session_token = saved_token
+                    st.session_state.license_checked = False
+                    st.session_state.session_restored = True
+                    if saved_code:
+                        # Favoritos antiguos: el código ya no se guarda junto al token
+                        del st.query_params['code']
+                else:
+                    # Token revocado o caducado: no se vuelve al código de la URL
+                    clear_url()
+        
+        # Sin clave de firma la sesión se restaura con el código de la URL
+        elif saved_code and session_tokens.get_secret() is None and not st.session_state.get('authenticated', False):
             is_valid, result = check_code_validity(saved_code)
             
             if is_valid:
@@ -59,10 +89,8 @@ def initialize_session():
         st.session_state.authenticated = False
     if 'user_tier' not in st.session_state:
         st.session_state.user_tier = None
-    if 'daily_uses' not in st.session_state:
-        st.session_state.daily_uses = 0
-    if 'last_reset' not in st.session_state:
-        st.session_state.last_reset = datetime.now().date()
+    if 'metered_uploads' not in st.session_state:
+        st.session_state.metered_uploads = set()
     if 'user_email' not in st.session_state:
         st.session_state.user_email = None
     if 'license_code' not in st.session_state:
@@ -75,12 +103,65 @@ def initialize_session():
         st.session_state.show_account_page = False
     if 'session_restored' not in st.session_state:
         st.session_state.session_restored = False
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = None
+    
+    # PASO 3: Comprobar la licencia de una sesión restaurada con token
+    refresh_license()
+
+def refresh_license():
+    """
+    Completa una sesión restaurada con token con los datos de la licencia
+
+    Usa la caché de licencias sin esperar: si el código aún no está, se lee en
+    segundo plano y se comprueba en el próximo rerun. Un código desactivado o
+    expirado revoca el token y cierra la sesión.
+    """
+    if not st.session_state.get('authenticated') or st.session_state.get('license_checked', True):
+        return
+    try:
+        import firebase_config
+        checked = firebase_config.peek_premium_code(st.session_state.license_code)
+    except Exception as e:
+        return
+    if checked is None:
+        return
+    is_valid, result = checked
+    if is_valid:
+        st.session_state.user_email = result.get('email', '')
+        st.session_state.expires = result.get('expires', '')
+        st.session_state.customer_name = result.get('customerName', 'Usuario Premium')
+        st.session_state.license_checked = True
+    elif result in ("Código desactivado", "Código expirado"):
+        revoke_session()
+        clear_url()
+        st.session_state.authenticated = False
+        st.session_state.user_tier = None
+        st.session_state.license_code = None
+        st.session_state.session_token = None
+        st.session_state.license_checked = True
 
 def save_code_to_url():
-    """Guarda el código Premium en la URL para persistencia"""
+    """
+    Guarda el token de sesión firmado en la URL para persistencia
+
+    El código solo se guarda si no hay clave de firma: con token, la URL no
+    lleva el código y revocar el token cierra la sesión de verdad.
+    """
     try:
         if st.session_state.get('license_code'):
-            st.query_params['code'] = st.session_state.license_code
+            if not st.session_state.get('session_token'):
+                st.session_state.session_token = session_tokens.issue(
+                    st.session_state.user_tier,
+                    st.session_state.license_code,
+                    st.session_state.expires,
+                )
+            if st.session_state.session_token:
+                st.query_params['s'] = st.session_state.session_token
+                if 'code' in st.query_params:
+                    del st.query_params['code']
+            else:
+                st.query_params['code'] = st.session_state.license_code
             return True
     except Exception as e:
         return False
@@ -89,30 +170,91 @@ def save_code_to_url():
 def clear_url():
     """Limpia la URL al cerrar sesión"""
     try:
-        if 'code' in st.query_params:
+        if 'code' in st.query_params or 's' in st.query_params:
             st.query_params.clear()
     except Exception as e:
         pass
 
-def reset_daily_counter():
-    """Resetea contador diario"""
-    today = datetime.now().date()
-    if st.session_state.last_reset != today:
-        st.session_state.daily_uses = 0
-        st.session_state.last_reset = today
+def revoke_session():
+    """Revoca el token de sesión para que la URL guardada deje de restaurarlo"""
+    try:
+        if st.session_state.get('session_token'):
+            session_tokens.revoke(st.session_state.session_token)
+    except Exception as e:
+        pass
+
+def usage_key():
+    """
+    Clave del contador de uso: licencia, email o la IP del cliente
+
+    Los usuarios gratuitos no tienen licencia ni email; su clave sale de la
+    IP (resumida con SHA-256, no se guarda en claro), que el cliente no elige,
+    así que abrir una sesión nueva no reinicia el cupo diario.
+    """
+    if st.session_state.get('license_code'):
+        return f"lic:{st.session_state.license_code.strip().upper()}"
+    if st.session_state.get('user_email'):
+        return f"email:{st.session_state.user_email.strip().lower()}"
+    try:
+        ip_address = st.context.ip_address
+    except Exception as e:
+        ip_address = None
+    if isinstance(ip_address, str) and ip_address:
+        return f"ip:{hashlib.sha256(ip_address.encode('utf-8')).hexdigest()[:32]}"
+    # Sin IP (p. ej. desarrollo local) se cuenta por sesión
+    if not st.session_state.get('usage_id'):
+        st.session_state.usage_id = secrets.token_urlsafe(9)
+    return f"anon:{st.session_state.usage_id}"
+
+def get_daily_uses():
+    """Análisis realizados hoy (contador compartido del proceso, sin red)"""
+    return metering.get_meter().count(usage_key())
+
+def _new_uploads(upload_ids):
+    return [upload_id for upload_id in dict.fromkeys(upload_ids) if upload_id not in st.session_state.metered_uploads]
 
-def increment_usage():
-    """Incrementa usos diarios"""
-    st.session_state.daily_uses += 1
+def check_upload_quota(upload_ids):
+    """
+    Comprueba antes de procesar que quedan análisis para los archivos nuevos (no cuenta nada)
+
+    Returns:
+        tuple: (permitido, mensaje de error)
+    """
+    new = _new_uploads(upload_ids)
+    if st.session_state.user_tier == 'premium' or not new:
+        return True, None
+    limit = TIER_LIMITS['free']['daily_analyses']
+    remaining = max(limit - get_daily_uses(), 0)
+    if len(new) > remaining:
+        if remaining == 0:
+            return False, f"Has alcanzado el límite diario ({limit} análisis)"
+        return False, f"Te quedan {remaining} análisis hoy y subiste {len(new)} archivos"
+    return True, None
+
+def increment_usage(upload_ids):
+    """
+    Cuenta un análisis por archivo procesado con éxito (los reruns del mismo
+    archivo no vuelven a contar)
+
+    Returns:
+        tuple: (permitido, mensaje de error)
+    """
+    new = _new_uploads(upload_ids)
+    if not new:
+        return True, None
+    limit = None if st.session_state.user_tier == 'premium' else TIER_LIMITS['free']['daily_analyses']
+    allowed, _ = metering.get_meter().increment(usage_key(), limit, amount=len(new))
+    if not allowed:
+        return False, f"Has alcanzado el límite diario ({limit} análisis)"
+    st.session_state.metered_uploads.update(new)
+    return True, None
 
 def check_usage_limit():
-    """Verifica límite de uso"""
-    reset_daily_counter()
-    if st.session_state.user_tier == 'premium':
+    """Verifica límite de uso (la sesión puede seguir viendo los archivos ya contados)"""
+    if st.session_state.user_tier == 'premium' or st.session_state.metered_uploads:
         return True, None
     limit = TIER_LIMITS['free']['daily_analyses']
-    current = st.session_state.daily_uses
-    if current >= limit:
+    if get_daily_uses() >= limit:
         return False, f"Has alcanzado el límite diario ({limit} análisis)"
     return True, None
 
@@ -131,12 +273,17 @@ def show_my_account_page():
     st.markdown("---")
     
     # Mostrar URL para guardar
-    current_url = f"{st.query_params.get('code', 'NO-GUARDADO')}"
-    if current_url != 'NO-GUARDADO':
+    if 's' in st.query_params:
+        current_url = f"s={st.query_params['s']}"
+    elif 'code' in st.query_params:
+        current_url = f"code={st.query_params['code']}"
+    else:
+        current_url = None
+    if current_url:
         st.info(f"""
         📌 **Importante:** Para mantener tu sesión activa, guarda esta URL como favorito:
 ```
-        https://tu-app.streamlit.app/?code={current_url}
+        https://tu-app.streamlit.app/?{current_url}
 ```
         
         Al abrir ese favorito, tu sesión se restaurará automáticamente.
@@ -284,10 +431,10 @@ def show_user_info_sidebar():
         st.session_state.session_restored = False
     
     if st.session_state.user_tier == 'free':
-        reset_daily_counter()
-        remaining = TIER_LIMITS['free']['daily_analyses'] - st.session_state.daily_uses
+        daily_uses = get_daily_uses()
+        remaining = max(TIER_LIMITS['free']['daily_analyses'] - daily_uses, 0)
         st.sidebar.metric("Análisis hoy", f"{remaining}/3")
-        progress = st.session_state.daily_uses / 3
+        progress = min(daily_uses / 3, 1.0)
         st.sidebar.progress(progress)
         
         if remaining <= 1:
@@ -320,6 +467,7 @@ def show_user_info_sidebar():
     st.sidebar.markdown("---")
     
     if st.sidebar.button("🚪 Cerrar Sesión", use_container_width=True):
+        revoke_session()
         clear_url()
         for key in list(st.session_state.keys()):
             del st.session_state[key]
@@ -0,0 +1,163 @@
+"""
+Procesamiento por lotes desde la línea de comandos
+Limpia todos los CSV/Excel de un directorio en paralelo (un proceso por archivo)
+y guarda los archivos limpios y un perfil JSON por archivo
+
+Uso:
+    python batch.py entradas/ -o limpios/ -f csv parquet -j 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import exporters
+import instrumentation
+import pipeline
+import streaming
+
+INPUT_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+SUMMARY_FILE = 'resumen.json'
+
+
+def find_files(input_dir, recursive=False):
+    """Archivos CSV/Excel del directorio, ordenados por nombre"""
+    pattern = '**/*' if recursive else '*'
+    return sorted(
+        path for path in Path(input_dir).glob(pattern)
+        if path.is_file() and path.suffix.lower() in INPUT_EXTENSIONS
+    )
+
+
+def output_stems(files):
+    """Nombre base de salida por archivo (con la extensión si dos archivos comparten nombre)"""
+    counts = Counter(path.stem for path in files)
+    return {path: path.stem if counts[path.stem] == 1 else path.name.replace('.', '_') for path in files}
+
+
+def write_json(path, payload):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+
+
+def process_file(path, output_dir, stem, formats, options=None):
+    """
+    Procesa un archivo y escribe sus salidas (se ejecuta en un proceso del pool)
+
+    Los CSV grandes se limpian por bloques y solo se exportan en CSV.
+
+    Returns:
+        dict: resumen del archivo para el reporte del lote
+    """
+    start = time.perf_counter()
+    path = Path(path)
+    output_dir = Path(output_dir)
+    data = path.read_bytes()
+    file_name = path.name
+    outputs = []
+
+    if pipeline.use_streaming(file_name, len(data)):
+        result = streaming.clean_csv_streaming(data, options=pipeline.resolve_options(options))
+        target = output_dir / f'{stem}.csv'
+        result.store.to_csv(target, result.columns, encoding='utf-8-sig')
+        result.store.cleanup()
+        outputs.append(target.name)
+        report = result.report
+        profile = None
+    else:
+        result, exports = pipeline.run_pipeline(data, file_name, options, formats)
+        for fmt, content in exports.items():
+            target = output_dir / f"{stem}.{exporters.EXPORT_FORMATS[fmt]['ext']}"
+            target.write_bytes(content)
+            outputs.append(target.name)
+        report = result.report
+        profile = result.profile.to_dict()
+
+    profile_path = output_dir / f'{stem}.profile.json'
+    write_json(profile_path, {'file': path.name, 'report': report, 'profile': profile})
+    return {
+        'file': path.name,
+        'rows_in': report['initial_stats']['rows'],
+        'rows_out': report['final_stats']['rows'],
+        'outputs': outputs + [profile_path.name],
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def run_batch(files, output_dir, formats=('csv',), options=None, workers=None):
+    """
+    Procesa los archivos en un ProcessPoolExecutor
+
+    Returns:
+        list: un resumen por archivo ('error' en lugar de salidas si falló)
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stems = output_stems(files)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_file, path, output_dir, stems[path], formats, options): path
+            for path in files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+                print(f"✅ {path.name}: {summary['rows_in']:,} → {summary['rows_out']:,} filas ({summary['seconds']:.1f} s)")
+            except Exception as e:
+                summary = {'file': path.name, 'error': str(e)}
+                print(f"❌ {path.name}: {e}", file=sys.stderr)
+            results.append(summary)
+    return sorted(results, key=lambda r: r['file'])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Limpia en lote archivos CSV y Excel")
+    parser.add_argument('input_dir', help="Directorio con los archivos a procesar")
+    parser.add_argument('-o', '--output', help="Directorio de salida (por defecto <input_dir>/limpios)")
+    parser.add_argument(
+        '-f', '--formats', nargs='+', default=['csv'], choices=exporters.available_formats(),
+        help="Formatos de exportación (por defecto csv)",
+    )
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Procesos en paralelo")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Incluir subdirectorios")
+    parser.add_argument('--subset', nargs='+', help="Columnas clave para detectar duplicados")
+    parser.add_argument('--keep', choices=['first', 'last'], default='first', help="Duplicado que se conserva")
+    parser.add_argument('--no-dedup', action='store_true', help="No eliminar duplicados")
+    parser.add_argument('--no-sort', action='store_true', help="No ordenar por la columna de fecha")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    instrumentation.configure_logging()
+    output_dir = Path(args.output) if args.output else Path(args.input_dir) / 'limpios'
+    files = [path for path in find_files(args.input_dir, args.recursive) if output_dir not in path.parents]
+    if not files:
+        print(f"No hay archivos CSV/Excel en {args.input_dir}", file=sys.stderr)
+        return 1
+
+    options = {
+        'dedup_subset': args.subset,
+        'dedup_keep': args.keep,
+        'drop_duplicates': not args.no_dedup,
+        'sort_by_date': not args.no_sort,
+    }
+    start = time.perf_counter()
+    results = run_batch(files, output_dir, args.formats, options, args.workers)
+    write_json(output_dir / SUMMARY_FILE, results)
+
+    failed = [r for r in results if 'error' in r]
+    print(f"{len(results) - len(failed)}/{len(results)} archivos procesados en {time.perf_counter() - start:.1f} s → {output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
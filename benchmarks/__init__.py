@@ -0,0 +1,5 @@
+"""
+Benchmarks del pipeline de limpieza y análisis
+Sin Streamlit ni Firebase: python -m benchmarks.run --sizes 10k 100k
+Arranque en frío (tiempo de importación): python -m benchmarks.importtime
+"""
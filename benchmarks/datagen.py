@@ -0,0 +1,107 @@
+"""
+Generador determinista de datasets sintéticos para los benchmarks
+Incluye fechas en texto, cadenas sucias, duplicados, outliers, filas y columnas vacías
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import exporters
+
+DEFAULT_SEED = 42
+
+# Proporciones de filas problemáticas
+DUPLICATE_RATIO = 0.05
+OUTLIER_RATIO = 0.01
+EMPTY_ROW_RATIO = 0.002
+
+CITIES = ['Madrid', 'Bogotá', 'Lima', 'Ciudad de México', 'Santiago', 'Buenos Aires', 'Quito', 'Sevilla']
+PRODUCTS = ['Plan Básico', 'Plan Pro', 'Licencia anual', 'Soporte', 'Consultoría', 'Hardware']
+
+DATA_DIR = os.path.join(tempfile.gettempdir(), 'excel_automator_bench')
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = str(text).strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def _dirty(values, rng):
+    """Añade espacios al inicio/final y cambia mayúsculas en parte de los valores"""
+    values = pd.Series(values, dtype=object)
+    n = len(values)
+    pad = rng.random(n)
+    values[pad < 0.2] = '  ' + values[pad < 0.2]
+    values[(pad >= 0.2) & (pad < 0.35)] = values[(pad >= 0.2) & (pad < 0.35)] + '   '
+    upper = rng.random(n) < 0.1
+    values[upper] = values[upper].str.upper()
+    return values
+
+
+def make_dataframe(n_rows, seed=DEFAULT_SEED):
+    """
+    DataFrame sucio con n_rows filas (duplicados y filas vacías incluidos)
+
+    Las fechas van como texto dd/mm/aaaa, igual que en un CSV exportado desde Excel.
+    """
+    rng = np.random.default_rng(seed)
+    n_unique = max(1, int(n_rows * (1 - DUPLICATE_RATIO - EMPTY_ROW_RATIO)))
+
+    dates = pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365, n_unique), unit='D')
+    amounts = rng.lognormal(4.5, 0.6, n_unique).round(2)
+    outliers = rng.random(n_unique) < OUTLIER_RATIO
+    amounts[outliers] *= rng.uniform(20, 100, outliers.sum())
+    quantity = rng.integers(1, 50, n_unique)
+    quantity[rng.random(n_unique) < OUTLIER_RATIO] = 10_000
+    notes = np.where(rng.random(n_unique) < 0.7, None, 'Revisar factura')
+
+    df = pd.DataFrame({
+        'Fecha': dates.strftime('%d/%m/%Y'),
+        'Cliente': _dirty(pd.Series(rng.integers(1, 5_000, n_unique)).map('Cliente {:04d}'.format), rng),
+        'Ciudad': _dirty(rng.choice(CITIES, n_unique), rng),
+        'Producto': rng.choice(PRODUCTS, n_unique),
+        'Importe': amounts,
+        'Cantidad': quantity,
+        'Descuento': rng.choice([0.0, 0.05, 0.1, 0.15], n_unique),
+        'Vencimiento': (dates + pd.Timedelta(days=30)).strftime('%d/%m/%Y'),
+        'Notas': notes,
+        'Vacía': None,
+    })
+
+    # Duplicados exactos repartidos por el archivo y algunas filas vacías
+    n_dup = n_rows - n_unique - int(n_rows * EMPTY_ROW_RATIO)
+    dup_rows = df.iloc[rng.integers(0, n_unique, max(0, n_dup))]
+    # reindex completa hasta n_rows con filas vacías
+    df = pd.concat([df, dup_rows], ignore_index=True).reindex(range(n_rows))
+    return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+
+def dataset_path(n_rows, fmt, seed=DEFAULT_SEED, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f'bench_{n_rows}_{seed}.{fmt}')
+
+
+def ensure_dataset(n_rows, fmt='csv', seed=DEFAULT_SEED, data_dir=DATA_DIR):
+    """
+    Ruta del archivo sintético, generándolo solo si no existe
+
+    Los archivos se reutilizan entre ejecuciones: misma semilla, mismos bytes.
+    """
+    path = dataset_path(n_rows, fmt, seed, data_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    df = make_dataframe(n_rows, seed)
+    tmp = path + '.tmp'
+    if fmt == 'csv':
+        df.to_csv(tmp, index=False)
+    elif fmt == 'xlsx':
+        exporters.write_excel(df, tmp)
+    else:
+        raise ValueError("fmt debe ser 'csv' o 'xlsx'")
+    os.replace(tmp, path)
+    return path
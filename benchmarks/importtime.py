@@ -0,0 +1,158 @@
+"""
+Mide el costo de importación de la app con python -X importtime
+
+Uso:
+    python -m benchmarks.importtime --output arranque.json
+    python -m benchmarks.importtime --compare arranque.json --check
+
+Cada objetivo se importa en un intérprete nuevo (se toma el mínimo de
+--repeat ejecuciones). 'login' es lo que se carga antes de mostrar la
+pantalla de acceso; --check falla si ahí aparece algún módulo pesado que
+debería importarse solo al usarse.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Objetivo -> módulos importados en el mismo intérprete
+TARGETS = {
+    'login': ['streamlit', 'auth'],
+    'analysis': ['streamlit', 'auth', 'pandas', 'admission', 'chart_data', 'correlation', 'data_cache',
+                 'exporters', 'insights', 'instrumentation', 'outliers', 'pipeline', 'preview', 'search_index'],
+    'charts': ['plotly.express', 'plotly.graph_objects'],
+    'stats': ['scipy.stats'],
+    'firebase': ['firebase_admin', 'firebase_admin.firestore'],
+}
+
+# Paquetes que no deben cargarse antes del login (plotly.graph_objects lo importa Streamlit)
+LAZY_PACKAGES = ('pandas', 'numpy', 'plotly.express', 'scipy', 'firebase_admin', 'google.cloud')
+
+DEFAULT_REPEAT = 5
+
+TOP_MODULES = 10
+
+
+def parse_importtime(stderr):
+    """
+    Filas de -X importtime como lista de dicts
+
+    Returns:
+        list: [{'module', 'self_us', 'cumulative_us', 'depth'}]
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        module = name.rstrip()
+        depth = (len(module) - len(module.lstrip())) // 2
+        rows.append({
+            'module': module.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': depth,
+        })
+    return rows
+
+
+def measure_target(modules, python=sys.executable):
+    """Importa los módulos en un proceso nuevo y devuelve las filas de importtime"""
+    code = '\n'.join(f'import {module}' for module in modules)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run(
+        [python, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return parse_importtime(proc.stderr)
+
+
+def summarize(rows, top=TOP_MODULES):
+    """Total (suma de importaciones de primer nivel), módulos cargados y los más lentos"""
+    total_us = sum(r['cumulative_us'] for r in rows if r['depth'] <= 1)
+    heaviest = sorted(rows, key=lambda r: r['self_us'], reverse=True)[:top]
+    return {
+        'ms': round(total_us / 1000, 1),
+        'modules': len(rows),
+        'top': [{'module': r['module'], 'self_ms': round(r['self_us'] / 1000, 1)} for r in heaviest],
+    }
+
+
+def run_target(name, repeat=DEFAULT_REPEAT):
+    """Mide un objetivo repeat veces y se queda con la ejecución más rápida"""
+    best_rows, best = None, None
+    for _ in range(repeat):
+        rows = measure_target(TARGETS[name])
+        summary = summarize(rows)
+        if best is None or summary['ms'] < best['ms']:
+            best_rows, best = rows, summary
+    loaded = {r['module'] for r in best_rows}
+    best['lazy_loaded'] = [package for package in LAZY_PACKAGES if package in loaded]
+    return {'target': name, **best}
+
+
+def compare(results, baseline):
+    """Imprime la variación de tiempo por objetivo respecto a un JSON anterior"""
+    before = {r['target']: r['ms'] for r in baseline['results']}
+    print(f"\n{'objetivo':<10} {'antes':>9} {'ahora':>9} {'cambio':>8}")
+    for r in results:
+        old = before.get(r['target'])
+        if old is None:
+            continue
+        change = (r['ms'] / old - 1) * 100 if old else 0
+        print(f"{r['target']:<10} {old:7.0f}ms {r['ms']:7.0f}ms {change:+7.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación (arranque en frío)")
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS), help="Objetivos a medir")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Ejecuciones por objetivo (se toma el mínimo)")
+    parser.add_argument('--output', help="Archivo JSON de resultados")
+    parser.add_argument('--compare', help="JSON de una ejecución anterior para comparar")
+    parser.add_argument('--check', action='store_true', help="Fallar si 'login' importa paquetes pesados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for name in args.targets:
+        result = run_target(name, args.repeat)
+        results.append(result)
+        heaviest = ', '.join(f"{m['module']} {m['self_ms']:.0f}ms" for m in result['top'][:3])
+        print(f"{name:<10} {result['ms']:8.0f} ms {result['modules']:5} módulos  ({heaviest})", flush=True)
+
+    payload = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+    if args.check:
+        login = next((r for r in results if r['target'] == 'login'), None) or run_target('login', 1)
+        if login['lazy_loaded']:
+            print(f"❌ La pantalla de acceso importa: {', '.join(login['lazy_loaded'])}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Mide cada etapa del pipeline por separado sobre datasets sintéticos
+
+Uso:
+    python -m benchmarks.run --sizes 10k 100k 1m --output resultados.json
+    python -m benchmarks.run --sizes 100k --compare resultados.json
+
+Cada etapa recibe la salida ya calculada de la anterior, así que el tiempo
+medido es solo el suyo. El pico de memoria se mide con tracemalloc en una
+ejecución aparte (incluye NumPy y pandas, no la memoria interna de pyarrow).
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import date_inference
+import dedup
+import exporters
+import ingest
+import insights
+import memory_optimizer
+import pipeline
+import profiling
+import search_index
+from benchmarks import datagen
+
+DEFAULT_SIZES = ['10k', '100k', '1m']
+
+DEFAULT_REPEAT = 3
+
+# Consultas de la etapa de búsqueda (la segunda reutiliza el resultado de la primera)
+SEARCH_QUERIES = ['cliente 01', 'cliente 012', 'madrid', 'no existe']
+
+
+def _search(df):
+    index = search_index.build_index(df)
+    return [len(index.search(query)) for query in SEARCH_QUERIES]
+
+
+# (nombre, función(ctx) -> salida, clave donde se guarda la salida en ctx)
+STAGES = [
+    ('sniff', lambda ctx: ingest.sniff_dialect(ingest.read_sample(ctx['csv'], ingest.detect_encoding(ctx['csv']))), None),
+    ('read_csv', lambda ctx: ingest.read_csv(ctx['csv'])[0], 'raw'),
+    ('read_excel', lambda ctx: ingest.read_excel(ctx['xlsx'])[0], None),
+    ('drop_empty', lambda ctx: ctx['raw'].dropna(axis=1, how='all').dropna(how='all'), 'df'),
+    ('dates', lambda ctx: date_inference.parse_dates(ctx['df'])[0], 'df'),
+    ('strip', lambda ctx: pipeline.strip_text(ctx['df']), 'df'),
+    ('dedup', lambda ctx: dedup.drop_duplicates(ctx['df']), 'dedup'),
+    ('memory', lambda ctx: memory_optimizer.optimize_memory(ctx['dedup'][0])[0], 'clean'),
+    ('profile', lambda ctx: profiling.build_profile(ctx['clean'], ctx['dedup'][2]), 'profile'),
+    ('insights', lambda ctx: insights.generate_insights(ctx['clean'], ctx['profile']), None),
+    ('search', lambda ctx: _search(ctx['clean']), None),
+    ('export_csv', lambda ctx: exporters.csv_bytes(ctx['clean']), None),
+    ('export_xlsx', lambda ctx: exporters.excel_bytes(ctx['clean'], True, ctx['dedup'][1]), None),
+    ('pipeline', lambda ctx: pipeline.process_upload(ctx['csv'], 'bench.csv'), None),
+]
+
+STAGE_NAMES = [name for name, _, _ in STAGES]
+
+
+def _rows(value):
+    if isinstance(value, tuple):
+        value = value[0]
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, pipeline.ProcessedUpload):
+        return len(value.df)
+    return None
+
+
+def measure(func, ctx, repeat=DEFAULT_REPEAT, memory=True):
+    """
+    Tiempo mínimo de repeat ejecuciones y pico de memoria de una ejecución extra
+
+    Returns:
+        tuple: (salida, {'seconds', 'runs', 'peak_mb'})
+    """
+    runs = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(ctx)
+        runs.append(time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func(ctx)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return output, {'seconds': min(runs), 'runs': runs, 'peak_mb': peak_mb}
+
+
+def run_size(n_rows, stages, repeat=DEFAULT_REPEAT, memory=True, seed=datagen.DEFAULT_SEED):
+    """Ejecuta las etapas pedidas para un tamaño de dataset"""
+    ctx = {'csv': Path(datagen.ensure_dataset(n_rows, 'csv', seed)).read_bytes()}
+    if 'read_excel' in stages:
+        ctx['xlsx'] = Path(datagen.ensure_dataset(n_rows, 'xlsx', seed)).read_bytes()
+
+    results = []
+    for name, func, store in STAGES:
+        # Las etapas no pedidas que producen entradas de otras se ejecutan una vez sin medir
+        if name not in stages:
+            if store:
+                ctx[store] = func(ctx)
+            continue
+        output, timing = measure(func, ctx, repeat, memory)
+        if store:
+            ctx[store] = output
+        results.append({'size': n_rows, 'stage': name, 'rows_out': _rows(output), **timing})
+        peak = f"{timing['peak_mb']:8.1f} MB" if timing['peak_mb'] is not None else ''
+        print(f"{n_rows:>9,} {name:<12} {timing['seconds']:9.3f} s {peak}", flush=True)
+    return results
+
+
+def metadata(seed):
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': memory_optimizer.arrow_strings_available(),
+        'seed': seed,
+    }
+
+
+def compare(results, baseline):
+    """Imprime la variación de tiempo por etapa respecto a un JSON anterior"""
+    before = {(r['size'], r['stage']): r['seconds'] for r in baseline['results']}
+    print(f"\n{'filas':>9} {'etapa':<12} {'antes':>9} {'ahora':>9} {'cambio':>8}")
+    for r in results:
+        old = before.get((r['size'], r['stage']))
+        if old is None:
+            continue
+        change = (r['seconds'] / old - 1) * 100 if old else 0
+        print(f"{r['size']:>9,} {r['stage']:<12} {old:9.3f} {r['seconds']:9.3f} {change:+7.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks por etapa del pipeline")
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help="Filas por dataset (10k, 100k, 1m)")
+    parser.add_argument('--stages', nargs='+', choices=STAGE_NAMES, default=STAGE_NAMES, help="Etapas a medir")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Repeticiones por etapa (se toma el mínimo)")
+    parser.add_argument('--no-memory', action='store_true', help="No medir el pico de memoria")
+    parser.add_argument('--seed', type=int, default=datagen.DEFAULT_SEED)
+    parser.add_argument('--output', help="Archivo JSON de resultados")
+    parser.add_argument('--compare', help="JSON de una ejecución anterior para comparar")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(datagen.parse_size(size), args.stages, args.repeat, not args.no_memory, args.seed))
+
+    payload = {'meta': metadata(args.seed), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Datos pre-agregados para gráficos
+El histograma y el box plot se calculan en el servidor y Plotly solo recibe
+los agregados: el tamaño del gráfico no depende del número de filas
+"""
+
+import numpy as np
+
+import data_cache
+
+# Límite de barras del histograma
+MAX_BINS = 100
+
+# Máximo de outliers dibujados como puntos en el box plot
+MAX_OUTLIER_POINTS = 500
+
+
+def finite_values(series):
+    """Valores numéricos finitos de la columna como float64"""
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+def _bin_count(values, q1, q3):
+    """Número de barras por la regla de Freedman-Diaconis (Sturges si el IQR es 0)"""
+    n = len(values)
+    span = values.max() - values.min()
+    if span == 0:
+        return 1
+    iqr = q3 - q1
+    if iqr > 0:
+        width = 2 * iqr / n ** (1 / 3)
+        bins = int(np.ceil(span / width))
+    else:
+        bins = int(np.ceil(np.log2(n))) + 1
+    return int(np.clip(bins, 1, MAX_BINS))
+
+
+def _quartiles(values, quantiles, column):
+    if quantiles is not None and column in quantiles.columns:
+        return (quantiles.loc[0.25, column], quantiles.loc[0.5, column], quantiles.loc[0.75, column])
+    return tuple(np.percentile(values, [25, 50, 75]))
+
+
+def histogram_payload(series, quantiles=None):
+    """
+    Conteos por intervalo con numpy.histogram
+
+    Returns:
+        dict: {'edges', 'counts', 'n'} o None si no hay valores
+    """
+    values = finite_values(series)
+    if len(values) == 0:
+        return None
+    q1, _, q3 = _quartiles(values, quantiles, series.name)
+    counts, edges = np.histogram(values, bins=_bin_count(values, q1, q3))
+    return {'edges': edges, 'counts': counts, 'n': len(values)}
+
+
+def box_payload(series, quantiles=None, max_outliers=MAX_OUTLIER_POINTS):
+    """
+    Estadísticas del box plot: cuartiles, bigotes (1.5·IQR) y una muestra de outliers
+
+    Returns:
+        dict o None si no hay valores
+    """
+    values = finite_values(series)
+    if len(values) == 0:
+        return None
+    q1, median, q3 = _quartiles(values, quantiles, series.name)
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    n_outliers = len(outliers)
+    if n_outliers > max_outliers:
+        # Muestra determinista que siempre conserva los extremos
+        rng = np.random.default_rng(0)
+        sample = rng.choice(outliers, size=max_outliers - 2, replace=False)
+        outliers = np.concatenate([[outliers.min(), outliers.max()], sample])
+    return {
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': inside.min() if len(inside) else q1,
+        'upperfence': inside.max() if len(inside) else q3,
+        'mean': values.mean(),
+        'outliers': outliers,
+        'n_outliers': n_outliers,
+        'n': len(values),
+    }
+
+
+def get_payload(kind, df, column, dataset_key, quantiles=None):
+    """Payload cacheado por dataset, tipo de gráfico y columna"""
+    builders = {'histogram': histogram_payload, 'box': box_payload}
+    key = f'{dataset_key}:{kind}:{column!r}'
+    return data_cache.get_cache().get_or_compute(key, lambda: builders[kind](df[column], quantiles))
+
+
+def histogram_figure(payload, column, color='#8b5cf6'):
+    """Histograma de Plotly a partir de los conteos"""
+    import plotly.graph_objects as go
+    edges = payload['edges']
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=payload['counts'],
+        width=np.diff(edges),
+        marker_color=color,
+        customdata=np.stack([edges[:-1], edges[1:]], axis=-1),
+        hovertemplate='%{customdata[0]:.4g} – %{customdata[1]:.4g}<br>count=%{y}<extra></extra>',
+    ))
+    fig.update_layout(bargap=0, xaxis_title=str(column), yaxis_title='count')
+    return fig
+
+
+def box_figure(payload, column, color='#10b981'):
+    """Box plot de Plotly con estadísticas precalculadas"""
+    import plotly.graph_objects as go
+    name = str(column)
+    fig = go.Figure(go.Box(
+        x=[name],
+        q1=[payload['q1']],
+        median=[payload['median']],
+        q3=[payload['q3']],
+        lowerfence=[payload['lowerfence']],
+        upperfence=[payload['upperfence']],
+        mean=[payload['mean']],
+        marker_color=color,
+        name=name,
+    ))
+    if len(payload['outliers']):
+        fig.add_trace(go.Scatter(
+            x=[name] * len(payload['outliers']),
+            y=payload['outliers'],
+            mode='markers',
+            marker_color=color,
+            name='outliers',
+        ))
+    fig.update_layout(showlegend=False, yaxis_title=name)
+    return fig
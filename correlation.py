@@ -0,0 +1,131 @@
+"""
+Motor de correlaciones con NumPy
+Pearson y Spearman con valores faltantes por pares, p-values con scipy.stats,
+caché por dataset y vista de los pares más fuertes para hojas anchas
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+METHODS = ('pearson', 'spearman')
+
+# Por encima de estas columnas la matriz completa deja de ser legible
+MAX_MATRIX_COLS = 30
+
+# Pares mostrados en la vista de pares más fuertes
+TOP_K = 20
+
+# Filas procesadas por bloque (limita la memoria con archivos largos)
+BLOCK_ROWS = 100_000
+
+
+@dataclass
+class CorrelationResult:
+    """Matriz de correlación con tamaño de muestra y p-value por par"""
+    method: str
+    r: pd.DataFrame
+    n: pd.DataFrame
+    p: pd.DataFrame
+
+    def top_pairs(self, k=TOP_K):
+        """Los k pares con mayor |r| (sin la diagonal ni pares repetidos)"""
+        cols = self.r.columns
+        i, j = np.triu_indices(len(cols), k=1)
+        r = self.r.to_numpy()[i, j]
+        valid = ~np.isnan(r)
+        i, j, r = i[valid], j[valid], r[valid]
+        order = np.argsort(-np.abs(r), kind='stable')[:k]
+        i, j = i[order], j[order]
+        return pd.DataFrame({
+            'Variable 1': cols[i],
+            'Variable 2': cols[j],
+            'r': r[order],
+            'p-value': self.p.to_numpy()[i, j],
+            'n': self.n.to_numpy()[i, j].astype(int),
+        })
+
+
+def pairwise_pearson(values, block_rows=BLOCK_ROWS):
+    """
+    Pearson por pares con valores faltantes (equivalente a DataFrame.corr)
+
+    Acumula por bloques de filas las sumas necesarias para cada par usando solo
+    las filas donde ambas columnas tienen valor.
+
+    Returns:
+        tuple: (r, n) como arreglos cols x cols
+    """
+    values = np.asarray(values, dtype='float64')
+    k = values.shape[1]
+    # Centrar por la media de cada columna reduce la cancelación numérica
+    with np.errstate(invalid='ignore'):
+        center = np.nanmean(values, axis=0) if len(values) else np.zeros(k)
+    center = np.nan_to_num(center)
+
+    n = np.zeros((k, k))
+    sx = np.zeros((k, k))
+    sxx = np.zeros((k, k))
+    sxy = np.zeros((k, k))
+    for start in range(0, len(values), block_rows):
+        block = values[start:start + block_rows] - center
+        mask = ~np.isnan(block)
+        x = np.where(mask, block, 0.0)
+        m = mask.astype('float64')
+        n += m.T @ m
+        sx += x.T @ m
+        sxx += (x * x).T @ m
+        sxy += x.T @ x
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sx.T / n
+        var = sxx - sx * sx / n
+        r = cov / np.sqrt(var * var.T)
+    r[(n < 2) | (var <= 0) | (var.T <= 0)] = np.nan
+    r = np.clip(r, -1.0, 1.0)
+    np.fill_diagonal(r, np.where(np.diag(n) >= 2, 1.0, np.nan))
+    return r, n
+
+
+def p_values(r, n):
+    """P-value bilateral de la prueba t para cada coeficiente"""
+    # scipy.stats tarda en importarse: se carga con la primera correlación
+    from scipy import stats
+    dof = n - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = r * np.sqrt(dof / (1 - r * r))
+        p = 2 * stats.t.sf(np.abs(t), dof)
+    p[dof < 1] = np.nan
+    return p
+
+
+def compute(df, columns, method='pearson'):
+    """
+    Correlación entre columnas numéricas
+
+    Spearman usa los rangos de cada columna completa, así que con valores
+    faltantes en posiciones distintas es una aproximación de la versión por pares.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method debe ser uno de {METHODS}")
+    data = df[columns]
+    if method == 'spearman':
+        data = data.rank()
+    r, n = pairwise_pearson(data.to_numpy(dtype='float64', na_value=np.nan))
+    p = p_values(r, n)
+    index = pd.Index(columns)
+    return CorrelationResult(
+        method=method,
+        r=pd.DataFrame(r, index=index, columns=index),
+        n=pd.DataFrame(n, index=index, columns=index),
+        p=pd.DataFrame(p, index=index, columns=index),
+    )
+
+
+def get_correlation(df, columns, method, dataset_key):
+    """Correlación cacheada por dataset y método"""
+    key = f'{dataset_key}:corr:{method}:{tuple(columns)!r}'
+    return data_cache.get_cache().get_or_compute(key, lambda: compute(df, columns, method))
@@ -0,0 +1,137 @@
+"""
+Caché LRU en memoria con presupuesto de bytes
+Compartida por todas las sesiones del proceso (los módulos importados sobreviven a los reruns)
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Presupuesto por defecto (configurable con la variable de entorno EXCEL_CACHE_MAX_MB)
+DEFAULT_MAX_MB = int(os.environ.get('EXCEL_CACHE_MAX_MB', '512'))
+
+
+def make_key(data, **options):
+    """Genera una clave a partir del contenido del archivo y las opciones del pipeline"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(data)
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def estimate_nbytes(value):
+    """Estima la memoria ocupada por un valor cacheado"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimate_nbytes(v) for v in value)
+    if hasattr(value, '__dict__'):
+        return sum(estimate_nbytes(v) for v in vars(value).values())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Caché LRU limitada por bytes, segura entre hilos"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        """Devuelve el valor y lo marca como usado recientemente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        """Guarda un valor y desaloja los menos usados hasta respetar el presupuesto"""
+        size = estimate_nbytes(value) if nbytes is None else nbytes
+        with self._lock:
+            self._discard(key)
+            # Un valor mayor que todo el presupuesto no se cachea
+            if size > self.max_bytes:
+                return False
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            return True
+
+    def get_or_compute(self, key, compute, nbytes=None):
+        """Devuelve el valor cacheado o lo calcula (fuera del lock) y lo guarda"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        self.put(key, value, nbytes)
+        return value
+
+    def invalidate(self, key):
+        """Elimina una entrada"""
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Resumen de uso de la caché"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+
+_MISSING = object()
+
+# Caché global del proceso
+_cache = LRUCache(DEFAULT_MAX_MB * 1024 * 1024)
+
+
+def get_cache():
+    """Devuelve la caché compartida del proceso"""
+    return _cache
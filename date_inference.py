@@ -0,0 +1,118 @@
+"""
+Detección de columnas de fecha por contenido
+Prueba formatos explícitos sobre una muestra pequeña y solo convierte la columna
+completa con el formato elegido (sin adivinar el formato elemento a elemento)
+"""
+
+import pandas as pd
+
+# Filas de muestra por columna
+SAMPLE_SIZE = 200
+
+# Proporción mínima de la muestra que debe encajar con el formato
+MIN_SAMPLE_MATCH = 0.9
+
+# Proporción mínima de fechas válidas en la columna completa
+MIN_VALID_RATIO = 0.5
+
+# Formatos en orden de prueba: día primero (datos en español) antes que mes primero
+DATE_FORMATS = (
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y %H:%M:%S',
+    '%d-%m-%Y',
+    '%d.%m.%Y',
+    '%d/%m/%y',
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y/%m/%d',
+    '%m/%d/%Y',
+    '%m/%d/%Y %H:%M',
+    '%m-%d-%Y',
+)
+
+# Nombres de columna que indican fecha
+NAME_HINTS = ('fecha', 'date')
+
+
+def has_date_name(col):
+    """Indica si el nombre de la columna sugiere una fecha"""
+    name = str(col).lower()
+    return any(hint in name for hint in NAME_HINTS)
+
+
+def sample_values(series, size=SAMPLE_SIZE):
+    """Muestra determinista de valores no nulos repartidos por toda la columna"""
+    values = series.dropna()
+    if len(values) > size:
+        step = len(values) // size
+        values = values.iloc[::step][:size]
+    return values
+
+
+def infer_format(series, sample_size=SAMPLE_SIZE):
+    """
+    Elige un formato de fecha probando sobre una muestra
+
+    Returns:
+        str: formato strptime o None si ninguno encaja
+    """
+    sample = sample_values(series, sample_size)
+    if len(sample) == 0 or pd.api.types.infer_dtype(sample, skipna=True) != 'string':
+        return None
+    sample = sample.str.strip()
+    lengths = sample.str.len()
+    digits = sample.str.contains(r'\d', regex=True)
+    # Descarta rápido columnas que no pueden ser fechas
+    if digits.mean() < MIN_SAMPLE_MATCH or not lengths.between(6, 30).mean() >= MIN_SAMPLE_MATCH:
+        return None
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+        if parsed.notna().mean() >= MIN_SAMPLE_MATCH:
+            return fmt
+    return None
+
+
+def parse_dates(df):
+    """
+    Convierte las columnas de fecha del DataFrame
+
+    Las columnas con nombre de fecha que no encajan en ningún formato conocido
+    mantienen la conversión genérica anterior. Devuelve un DataFrame nuevo
+    (copia superficial): el recibido no se modifica.
+
+    Returns:
+        tuple: (df, columnas_fecha, formatos_usados)
+    """
+    df = df.copy(deep=False)
+    hinted = []
+    others = []
+    formats = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            if series.notna().sum() > len(df) * MIN_VALID_RATIO:
+                (hinted if has_date_name(col) else others).append(col)
+            continue
+        if series.dtype != 'object':
+            continue
+
+        fmt = infer_format(series)
+        if fmt is not None:
+            parsed = pd.to_datetime(series.str.strip(), format=fmt, errors='coerce')
+            if parsed.notna().sum() > len(df) * MIN_VALID_RATIO:
+                df[col] = parsed
+                formats[col] = fmt
+                (hinted if has_date_name(col) else others).append(col)
+        elif has_date_name(col):
+            try:
+                df[col] = pd.to_datetime(series, errors='coerce')
+                if df[col].notna().sum() > len(df) * MIN_VALID_RATIO:
+                    hinted.append(col)
+            except Exception:
+                pass
+
+    # Las columnas con nombre de fecha tienen prioridad para ordenar
+    return df, hinted + others, formats
@@ -0,0 +1,71 @@
+"""
+Detección de duplicados con hashes de fila vectorizados
+El arreglo de hashes se calcula una vez y se reutiliza en la limpieza, el perfil y los insights
+"""
+
+import numpy as np
+import pandas as pd
+
+KEEP_OPTIONS = ('first', 'last')
+
+
+def _normalize_numeric(frame, unify_numeric):
+    """Iguala -0.0 y 0.0 (y opcionalmente enteros y decimales) antes de calcular el hash"""
+    columns = frame.select_dtypes(include=[np.number]).columns
+    if unify_numeric:
+        updates = {col: frame[col].astype('float64') + 0.0 for col in columns}
+    else:
+        updates = {col: frame[col] + 0.0 for col in columns if pd.api.types.is_float_dtype(frame[col].dtype)}
+    if updates:
+        frame = frame.copy(deep=False)
+        for col, values in updates.items():
+            frame[col] = values
+    return frame
+
+
+def row_hashes(df, subset=None, unify_numeric=False):
+    """
+    Hash de 64 bits por fila (pd.util.hash_pandas_object)
+
+    Dos filas distintas solo coinciden por colisión (probabilidad ~n²/2^65).
+    Con unify_numeric=True, 1 y 1.0 tienen el mismo hash (útil al comparar bloques
+    de un CSV cuyas columnas pueden cambiar de tipo entre bloques).
+    """
+    frame = df if subset is None else df[list(subset)]
+    if len(frame.columns) == 0:
+        return np.zeros(len(frame), dtype=np.uint64)
+    frame = _normalize_numeric(frame, unify_numeric)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def duplicate_mask(hashes, keep='first'):
+    """Máscara booleana de filas repetidas según sus hashes"""
+    if keep not in KEEP_OPTIONS:
+        raise ValueError(f"keep debe ser uno de {KEEP_OPTIONS}")
+    return pd.Series(hashes, copy=False).duplicated(keep=keep).to_numpy()
+
+
+def valid_subset(df, subset):
+    """Filtra las columnas clave que existen en el DataFrame (None = fila completa)"""
+    if not subset:
+        return None
+    subset = [col for col in subset if col in df.columns]
+    return subset or None
+
+
+def drop_duplicates(df, subset=None, keep='first'):
+    """
+    Elimina duplicados por fila completa o por un subconjunto de columnas clave
+
+    Returns:
+        tuple: (df_sin_duplicados, filas_eliminadas, hashes_de_fila_conservadas)
+    """
+    subset = valid_subset(df, subset)
+    hashes = row_hashes(df)
+    key_hashes = hashes if subset is None else row_hashes(df, subset)
+    mask = duplicate_mask(key_hashes, keep)
+    if not mask.any():
+        return df, df.iloc[0:0], hashes
+    removed = df[mask].reset_index(drop=True)
+    kept = df[~mask].reset_index(drop=True)
+    return kept, removed, hashes[~mask]
@@ -3,12 +3,7 @@ AUTOMATIZADOR EXCEL PROFESIONAL
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from io import BytesIO
-import numpy as np
 from datetime import datetime
-from scipy import stats
 import warnings
 
 warnings.filterwarnings('ignore')
@@ -30,6 +25,25 @@ if st.session_state.get('show_account_page', False):
     auth.show_my_account_page()
     st.stop()
 
+# Los módulos de análisis (pandas, NumPy) se importan después del login para que
+# la pantalla de acceso aparezca sin esperarlos; Plotly, SciPy y Firebase se
+# importan al usar el gráfico o la función que los necesita
+import pandas as pd
+
+import admission
+import chart_data
+import correlation
+import data_cache
+import exporters
+import insights
+import instrumentation
+import outliers
+import pipeline
+import preview
+import search_index
+
+instrumentation.configure_logging()
+
 can_use, error_message = auth.check_usage_limit()
 
 if not can_use:
@@ -125,48 +139,182 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # FUNCIONES
-def detect_outliers(df, column):
-    if pd.api.types.is_numeric_dtype(df[column]):
-        Q1 = df[column].quantile(0.25)
-        Q3 = df[column].quantile(0.75)
-        IQR = Q3 - Q1
-        lower = Q1 - 1.5 * IQR
-        upper = Q3 + 1.5 * IQR
-        outliers = df[(df[column] < lower) | (df[column] > upper)]
-        return outliers, lower, upper
-    return None, None, None
-
-def generate_insights(df):
-    insights = []
-    null_cols = df.columns[df.isnull().any()].tolist()
-    if null_cols:
-        insights.append(f"⚠️ {len(null_cols)} columnas con valores faltantes")
-    dup_count = df.duplicated().sum()
-    if dup_count > 0:
-        insights.append(f"🔄 {dup_count} filas duplicadas ({(dup_count/len(df)*100):.1f}%)")
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_cols[:2]:
-        outliers, _, _ = detect_outliers(df, col)
-        if outliers is not None and len(outliers) > 0:
-            insights.append(f"📊 '{col}': {len(outliers)} outliers detectados")
-    return insights if insights else ["✅ Datos sin problemas significativos"]
-
-def create_excel_download(df, include_stats=False):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Datos', index=False)
-        workbook = writer.book
-        worksheet = writer.sheets['Datos']
-        header_format = workbook.add_format({'bold': True, 'bg_color': '#3b82f6', 'font_color': 'white', 'border': 1})
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-            max_len = max(df[value].astype(str).apply(len).max(), len(str(value)))
-            worksheet.set_column(col_num, col_num, min(max_len + 2, 50))
-        if include_stats:
-            numeric_df = df.select_dtypes(include=[np.number])
-            if len(numeric_df.columns) > 0:
-                numeric_df.describe().to_excel(writer, sheet_name='Estadísticas')
-    return output.getvalue()
+def dedup_options():
+    """Opciones de duplicados elegidas en el rerun anterior"""
+    return {
+        'dedup_subset': st.session_state.get('dedup_subset') or None,
+        'dedup_keep': 'last' if st.session_state.get('dedup_keep') == 'Última' else 'first',
+    }
+
+def show_dedup_options(columns):
+    with st.expander("🔄 Opciones de duplicados", expanded=False):
+        st.multiselect("Columnas clave (vacío = fila completa)", list(columns), key='dedup_subset')
+        st.radio("Conservar aparición", ["Primera", "Última"], key='dedup_keep', horizontal=True)
+        st.caption("Las filas eliminadas se exportan en la hoja 'Duplicados' del Excel")
+
+def show_data_preview(df, dataset_key, search=''):
+    """Vista previa paginada; con búsqueda muestra solo las filas que coinciden"""
+    row_ids = search_index.get_index(df, dataset_key).search(search) if search else None
+    total = len(df) if row_ids is None else len(row_ids)
+    page_size = search_index.PAGE_SIZE if search else preview.PAGE_SIZE
+    pages = preview.page_count(total, page_size)
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        sort_col = st.selectbox("Ordenar por", ["(sin ordenar)"] + list(df.columns), key='preview_sort')
+    with col2:
+        descending = st.checkbox("Descendente", key='preview_desc')
+    with col3:
+        page = st.number_input("Página", min_value=1, max_value=pages, value=1, step=1)
+
+    order = None
+    if sort_col != "(sin ordenar)":
+        order = preview.sort_order(df, sort_col, not descending, dataset_key)
+
+    page_df = preview.get_page(df, page, page_size, order, row_ids)
+    start = (page - 1) * page_size
+    if search:
+        st.caption(f"Mostrando {len(page_df)} de {total} resultados (página {page}/{pages})")
+    else:
+        st.caption(f"Filas {min(start + 1, total):,}–{start + len(page_df):,} de {total:,} (página {page}/{pages})")
+    st.dataframe(page_df, use_container_width=True)
+
+def show_cleaning_summary(report):
+    if report['sorted_by']:
+        st.success(f"✅ Ordenado por '{report['sorted_by']}'")
+
+    initial_stats = report['initial_stats']
+    final_stats = report['final_stats']
+
+    if initial_stats != final_stats:
+        st.success("✨ Limpieza Completada")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Filas Eliminadas", initial_stats['rows'] - final_stats['rows'])
+        with col2:
+            st.metric("Columnas Vacías", initial_stats['cols'] - final_stats['cols'])
+        with col3:
+            st.metric("Duplicados", report['duplicates_removed'])
+        with col4:
+            st.metric("Filas Finales", final_stats['rows'])
+
+    read_info = report.get('read_info', {})
+    if read_info.get('engine'):
+        st.caption(f"⚙️ Motor de lectura: {read_info['engine']}")
+
+def admit_uploads(uploaded_files):
+    """
+    Decisión de admisión por archivo según el archivo y el plan (se guarda por
+    subida para no repetirla en cada rerun; el presupuesto de memoria del
+    proceso se reserva al procesar)
+    """
+    tier = st.session_state.user_tier
+    decisions = st.session_state.setdefault('admissions', {})
+    result = {}
+    for uploaded_file in uploaded_files:
+        key = (tier, upload_id(uploaded_file))
+        if key not in decisions:
+            decisions[key] = admission.admit(uploaded_file.getvalue(), uploaded_file.name, auth.TIER_LIMITS[tier])
+        result[upload_id(uploaded_file)] = decisions[key]
+    return result
+
+def upload_labels(uploaded_files):
+    """Nombre a mostrar por archivo; los nombres repetidos (otras carpetas) se numeran"""
+    labels, seen = {}, {}
+    for uploaded_file in uploaded_files:
+        seen[uploaded_file.name] = seen.get(uploaded_file.name, 0) + 1
+        n = seen[uploaded_file.name]
+        labels[upload_id(uploaded_file)] = uploaded_file.name if n == 1 else f"{uploaded_file.name} ({n})"
+    return labels
+
+def load_multiple(uploaded_files, options, decisions):
+    """
+    Procesa varios archivos en paralelo y devuelve la vista elegida:
+    la combinación de todos o el resultado de un archivo
+    """
+    labels = upload_labels(uploaded_files)
+    files = []
+    for uploaded_file in uploaded_files:
+        data = uploaded_file.getvalue()
+        file_id = upload_id(uploaded_file)
+        if decisions[file_id]['action'] == admission.STREAM or pipeline.use_streaming(uploaded_file.name, len(data)):
+            st.warning(f"⚠️ {labels[file_id]} es demasiado grande para combinarlo: súbelo por separado")
+        else:
+            files.append((file_id, data, uploaded_file.name))
+
+    reserve_mb = {file_id: decisions[file_id]['estimated_mb'] for file_id, _, _ in files}
+    results, errors = pipeline.load_uploads(files, options, reserve_mb=reserve_mb)
+    for file_id, error in errors.items():
+        st.error(f"❌ {labels[file_id]}: {error}")
+    if not results:
+        return None, None
+    if not record_usage([f for f in uploaded_files if upload_id(f) in results]):
+        return None, None
+
+    summary = pd.DataFrame({
+        'Archivo': [labels[file_id] for file_id in results],
+        'Filas': [len(r.df) for r in results.values()],
+        'Columnas': [len(r.df.columns) for r in results.values()],
+        'Duplicados eliminados': [r.report['duplicates_removed'] for r in results.values()],
+    })
+    with st.expander(f"📁 {len(results)} archivos procesados", expanded=False):
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        view = st.radio("Vista", ["Combinado", "Por archivo"], horizontal=True, key='multi_view')
+    if view == "Combinado":
+        merged = pipeline.load_merged(results, options, labels)
+        st.caption(f"Columnas alineadas por nombre; la columna '{pipeline.SOURCE_COLUMN}' indica el archivo de origen y los duplicados se buscan entre todos los archivos")
+        return merged, f"{len(results)} archivos combinados"
+    with col2:
+        file_id = st.selectbox("Archivo", list(results), format_func=labels.get, key='multi_file')
+    return results[file_id], labels[file_id]
+
+def show_performance_panel(report):
+    """Panel opcional en la barra lateral con los tiempos de cada etapa"""
+    if not st.sidebar.checkbox("⏱️ Panel de rendimiento", key='perf_panel'):
+        return
+    timings = report.get('timings', [])
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=True):
+        if not timings:
+            st.caption("Sin tiempos registrados para este archivo")
+        else:
+            st.dataframe(instrumentation.timings_table(timings), use_container_width=True, hide_index=True)
+            st.caption(f"Total: {sum(t['seconds'] for t in timings):.2f} s (medido al procesar el archivo; los reruns usan la caché)")
+        cache_stats = data_cache.get_cache().stats()
+        st.caption(f"Caché: {cache_stats['entries']} entradas, {cache_stats['bytes'] / 1024 ** 2:.0f}/{cache_stats['max_bytes'] / 1024 ** 2:.0f} MB, {cache_stats['hits']} aciertos / {cache_stats['misses']} fallos")
+
+def upload_id(uploaded_file):
+    """Identifica un archivo subido (Streamlit asigna un file_id nuevo a cada subida)"""
+    return getattr(uploaded_file, 'file_id', None) or f"{uploaded_file.name}:{uploaded_file.size}"
+
+def record_usage(uploaded_files):
+    """Cuenta un análisis por archivo procesado; False (con el aviso) si se alcanzó el límite"""
+    allowed, message = auth.increment_usage([upload_id(f) for f in uploaded_files])
+    if not allowed:
+        st.error(f"🔒 {message}")
+        st.info("💡 **Actualiza a Premium** para análisis ilimitados")
+    elif st.session_state.user_tier == 'free':
+        st.success(f"✅ ({auth.get_daily_uses()}/3 usados hoy)")
+    return allowed
+
+def show_streaming_result(result, file_name):
+    """Vista reducida para archivos limpiados por bloques (no se cargan completos en memoria)"""
+    st.success(f"✅ Archivo procesado por bloques: **{file_name}**")
+    st.info(f"📦 Archivo grande: se procesó en {result.report['chunks']} bloques. Se muestra una vista previa y la exportación CSV.")
+
+    st.markdown("### Vista Previa")
+    st.dataframe(result.head(100), use_container_width=True)
+
+    # El CSV se genera al pulsar el botón, una sola vez por resultado en caché
+    st.download_button(
+        "📥 CSV",
+        lambda: open(result.csv_path(), 'rb'),
+        f"datos_{datetime.now().strftime('%Y%m%d')}.csv",
+        mime='text/csv',
+        type="primary",
+    )
 
 # SIDEBAR PARA PC
 st.sidebar.markdown('<div class="user-info-box">', unsafe_allow_html=True)
@@ -178,7 +326,7 @@ if st.session_state.get('user_tier', 'free') == 'premium':
 else:
     st.sidebar.info("🆓 **CUENTA FREE**")
     # Mostrar usos restantes
-    daily_uses = st.session_state.get('daily_uses', 0)
+    daily_uses = auth.get_daily_uses()
     st.sidebar.markdown(f"**Análisis hoy:** {daily_uses}/3")
     if daily_uses >= 2:
         st.sidebar.warning("⚠️ Cerca del límite diario")
@@ -232,7 +380,7 @@ def main():
             st.success("⭐ **CUENTA PREMIUM** - Análisis ilimitados")
         else:
             st.info("🆓 **CUENTA FREE**")
-            daily_uses = st.session_state.get('daily_uses', 0)
+            daily_uses = auth.get_daily_uses()
             st.markdown(f"**Análisis realizados hoy:** {daily_uses}/3")
             if daily_uses >= 2:
                 st.warning("⚠️ Cerca del límite diario")
@@ -273,66 +421,73 @@ def main():
         """)
     st.markdown('</div>', unsafe_allow_html=True)
     
-    uploaded_file = st.file_uploader("Arrastra tu archivo Excel o CSV aquí", type=['xlsx', 'xls', 'csv'])
+    uploaded_files = st.file_uploader("Arrastra tus archivos Excel o CSV aquí", type=['xlsx', 'xls', 'csv'], accept_multiple_files=True)
     
-    if uploaded_file:
+    if uploaded_files:
         try:
-            if uploaded_file.name.endswith('.csv'):
-                try:
-                    df = pd.read_csv(uploaded_file, sep=None, engine='python', encoding='utf-8')
-                except:
-                    uploaded_file.seek(0)
-                    df = pd.read_csv(uploaded_file, sep=';', encoding='utf-8')
-                df.columns = df.columns.str.strip().str.replace('"', '').str.replace("'", "")
-            else:
-                df = pd.read_excel(uploaded_file)
-            
             st.info("🔧 Procesando...")
             
-            initial_stats = {'rows': len(df), 'cols': len(df.columns), 'duplicates': df.duplicated().sum()}
-            df = df.dropna(axis=1, how='all').dropna(how='all')
-            
-            date_cols = []
-            for col in df.columns:
-                if 'fecha' in col.lower() or 'date' in col.lower():
+            # Tamaño, descompresión y memoria estimada antes de leer nada
+            decisions = admit_uploads(uploaded_files)
+            labels = upload_labels(uploaded_files)
+            for file_id, decision in decisions.items():
+                if decision['action'] == admission.REJECT:
+                    st.error(f"❌ {labels[file_id]}: {decision['reason']}")
+            uploaded_files = [f for f in uploaded_files if decisions[upload_id(f)]['action'] != admission.REJECT]
+            if not uploaded_files:
+                return
+
+            # Un análisis por archivo, contado después de procesarlo con éxito;
+            # antes solo se comprueba que queden análisis para todos
+            allowed, limit_message = auth.check_upload_quota([upload_id(f) for f in uploaded_files])
+            if not allowed:
+                st.error(f"🔒 {limit_message}")
+                st.info("💡 **Actualiza a Premium** para análisis ilimitados")
+                return
+
+            options = dedup_options()
+            if len(uploaded_files) == 1:
+                uploaded_file = uploaded_files[0]
+                data = uploaded_file.getvalue()
+                decision = decisions[upload_id(uploaded_file)]
+                stream = decision['action'] == admission.STREAM or pipeline.use_streaming(uploaded_file.name, len(data))
+                if not stream:
                     try:
-                        df[col] = pd.to_datetime(df[col], errors='coerce')
-                        if df[col].notna().sum() > len(df) * 0.5:
-                            date_cols.append(col)
-                    except:
-                        pass
-            
-            if date_cols:
-                df = df.sort_values(by=date_cols[0], ascending=True).reset_index(drop=True)
-                st.success(f"✅ Ordenado por '{date_cols[0]}'")
-            
-            for col in df.select_dtypes(include=['object']).columns:
-                df[col] = df[col].str.strip() if df[col].dtype == 'object' else df[col]
-            
-            duplicates_removed = df.duplicated().sum()
-            if duplicates_removed > 0:
-                df = df.drop_duplicates().reset_index(drop=True)
-            
-            final_stats = {'rows': len(df), 'cols': len(df.columns)}
-            
-            if initial_stats != final_stats:
-                st.success("✨ Limpieza Completada")
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Filas Eliminadas", initial_stats['rows'] - final_stats['rows'])
-                with col2:
-                    st.metric("Columnas Vacías", initial_stats['cols'] - final_stats['cols'])
-                with col3:
-                    st.metric("Duplicados", duplicates_removed)
-                with col4:
-                    st.metric("Filas Finales", final_stats['rows'])
-            
-            st.success(f"✅ Archivo procesado: **{uploaded_file.name}**")
-            
-            if st.session_state.user_tier == 'free':
-                auth.increment_usage()
-                st.success(f"✅ ({st.session_state.daily_uses}/3 usados hoy)")
-            
+                        result = pipeline.load_upload(data, uploaded_file.name, options, decision['estimated_mb'])
+                    except admission.BudgetExceeded as e:
+                        if not pipeline.is_csv(uploaded_file.name):
+                            st.warning(f"⏳ {e}")
+                            st.button("🔄 Reintentar")
+                            return
+                        # Los CSV se limpian por bloques, con memoria acotada
+                        decision = dict(decision, reason="El servidor está ocupado: se procesará por bloques")
+                        stream = True
+                if stream:
+                    if decision['reason']:
+                        st.info(f"📦 {decision['reason']}")
+                    result = pipeline.load_upload_streaming(data, uploaded_file.name, options)
+                    if not record_usage(uploaded_files):
+                        return
+                    show_cleaning_summary(result.report)
+                    show_performance_panel(result.report)
+                    show_streaming_result(result, uploaded_file.name)
+                    return
+                if not record_usage(uploaded_files):
+                    return
+                label = uploaded_file.name
+            else:
+                result, label = load_multiple(uploaded_files, options, decisions)
+                if result is None:
+                    return
+
+            df = result.df
+            profile = result.profile
+            show_cleaning_summary(result.report)
+            show_performance_panel(result.report)
+            show_dedup_options(df.columns)
+
+            st.success(f"✅ Archivo procesado: **{label}**")
+
             tab1, tab2, tab3, tab4 = st.tabs(["📊 Resumen", "🔍 Explorar", "📈 Gráficos", "💾 Exportar"])
             
             with tab1:
@@ -343,72 +498,96 @@ def main():
                 with col2:
                     st.metric("Columnas", len(df.columns))
                 with col3:
-                    completeness = 100 - (df.isnull().sum().sum() / (len(df) * len(df.columns)) * 100)
-                    st.metric("Completitud", f"{completeness:.1f}%")
+                    st.metric("Completitud", f"{profile.completeness:.1f}%")
                 with col4:
-                    st.metric("Duplicados", df.duplicated().sum())
-                
+                    st.metric("Duplicados", profile.duplicate_count)
+
+                memory = result.report.get('memory')
+                if memory:
+                    saved = (1 - memory['after'] / memory['before']) * 100 if memory['before'] else 0
+                    st.caption(f"💾 Memoria: {memory['before'] / 1024 ** 2:.1f} MB → {memory['after'] / 1024 ** 2:.1f} MB ({saved:.0f}% menos)")
+
                 st.markdown("---")
                 st.markdown("### 🧠 Insights")
-                for insight in generate_insights(df):
+                outlier_summary = outliers.get_summary(df, profile.numeric_cols, 'iqr', result.key, profile.quantiles)
+                for insight in insights.generate_insights(df, profile, outlier_summary):
                     st.info(insight)
                 
                 st.markdown("---")
                 st.markdown("### Vista Previa")
                 search = st.text_input("🔍 Buscar", placeholder="Escribe para buscar...")
-                if search:
-                    mask = df.astype(str).apply(lambda x: x.str.contains(search, case=False, na=False)).any(axis=1)
-                    filtered = df[mask]
-                    st.caption(f"Mostrando {len(filtered)} resultados")
-                    st.dataframe(filtered.head(50), use_container_width=True)
-                else:
-                    st.dataframe(df.head(100), use_container_width=True)
+                show_data_preview(df, result.key, search)
             
             with tab2:
                 st.markdown("### Análisis Exploratorio")
-                info_list = []
-                for col in df.columns:
-                    info_list.append({
-                        'Columna': col,
-                        'Tipo': str(df[col].dtype),
-                        'Únicos': df[col].nunique(),
-                        'Nulos': df[col].isnull().sum()
-                    })
-                st.dataframe(pd.DataFrame(info_list), use_container_width=True, hide_index=True)
+                st.dataframe(profile.column_table(), use_container_width=True, hide_index=True)
+
+                if profile.numeric_cols:
+                    st.markdown("### 🎯 Outliers por columna")
+                    method_name = st.radio("Método", list(outliers.METHOD_NAMES.values()), horizontal=True, key='outlier_method')
+                    method = {name: key for key, name in outliers.METHOD_NAMES.items()}[method_name]
+                    summary = outliers.get_summary(df, profile.numeric_cols, method, result.key, profile.quantiles)
+                    st.dataframe(summary, use_container_width=True, hide_index=True)
             
             with tab3:
                 st.markdown("### Visualizaciones")
-                numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+                numeric_cols = profile.numeric_cols
                 if numeric_cols:
                     viz_type = st.selectbox("Tipo", ["Histograma", "Box Plot", "Correlación"])
                     if viz_type == "Histograma":
                         col = st.selectbox("Columna", numeric_cols)
-                        fig = px.histogram(df, x=col, color_discrete_sequence=['#8b5cf6'])
-                        st.plotly_chart(fig, use_container_width=True)
+                        payload = chart_data.get_payload('histogram', df, col, result.key, profile.quantiles)
+                        if payload is None:
+                            st.info("Sin valores numéricos para graficar")
+                        else:
+                            fig = chart_data.histogram_figure(payload, col, '#8b5cf6')
+                            st.plotly_chart(fig, use_container_width=True)
                     elif viz_type == "Box Plot":
                         col = st.selectbox("Columna", numeric_cols)
-                        fig = px.box(df, y=col, color_discrete_sequence=['#10b981'])
-                        st.plotly_chart(fig, use_container_width=True)
+                        payload = chart_data.get_payload('box', df, col, result.key, profile.quantiles)
+                        if payload is None:
+                            st.info("Sin valores numéricos para graficar")
+                        else:
+                            fig = chart_data.box_figure(payload, col, '#10b981')
+                            st.plotly_chart(fig, use_container_width=True)
+                            if payload['n_outliers'] > len(payload['outliers']):
+                                st.caption(f"Se muestran {len(payload['outliers'])} de {payload['n_outliers']} outliers")
                     elif viz_type == "Correlación" and len(numeric_cols) >= 2:
-                        corr = df[numeric_cols].corr()
-                        fig = px.imshow(corr, text_auto='.2f', aspect="auto", color_continuous_scale='RdBu_r')
-                        st.plotly_chart(fig, use_container_width=True)
+                        wide = len(numeric_cols) > correlation.MAX_MATRIX_COLS
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            method = st.radio("Método", ["Pearson", "Spearman"], horizontal=True)
+                        with col2:
+                            view = st.radio("Vista", ["Matriz", "Pares más fuertes"], index=1 if wide else 0, horizontal=True)
+                        corr = correlation.get_correlation(df, numeric_cols, method.lower(), result.key)
+                        if view == "Matriz":
+                            import plotly.express as px
+                            fig = px.imshow(corr.r, text_auto=False if wide else '.2f', aspect="auto", color_continuous_scale='RdBu_r', zmin=-1, zmax=1)
+                            st.plotly_chart(fig, use_container_width=True)
+                        else:
+                            st.dataframe(corr.top_pairs().style.format({'r': '{:.3f}', 'p-value': '{:.2g}'}), use_container_width=True, hide_index=True)
             
             with tab4:
                 st.markdown("### Exportar")
-                if st.button("🎯 Preparar", type="primary"):
-                    st.session_state['export_df'] = df
-                    st.success("✅ Listo")
-                
-                if 'export_df' in st.session_state:
-                    df_exp = st.session_state['export_df']
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        csv = df_exp.to_csv(index=False).encode('utf-8-sig')
-                        st.download_button("📥 CSV", csv, f"datos_{datetime.now().strftime('%Y%m%d')}.csv")
-                    with col2:
-                        excel = create_excel_download(df_exp, True)
-                        st.download_button("📥 Excel", excel, f"datos_{datetime.now().strftime('%Y%m%d')}.xlsx")
+                st.caption("Los archivos se generan al pulsar descargar y se reutilizan mientras no cambie el dataset")
+                stamp = datetime.now().strftime('%Y%m%d')
+                formats = exporters.available_formats()
+                cols = st.columns(3)
+                for i, fmt in enumerate(formats):
+                    spec = exporters.EXPORT_FORMATS[fmt]
+                    with cols[i % 3]:
+                        if fmt == 'xlsx':
+                            try:
+                                exporters.check_excel(df, result.removed)
+                            except ValueError as e:
+                                st.warning(f"⚠️ {e}")
+                                continue
+                        st.download_button(
+                            f"📥 {spec['label']}",
+                            lambda fmt=fmt: exporters.get_artifact(fmt, df, result.key, result.removed),
+                            f"datos_{stamp}.{spec['ext']}", mime=spec['mime'], on_click='ignore',
+                        )
+                st.caption("Parquet y Feather conservan los tipos de columna y son los más rápidos de volver a cargar")
         
         except Exception as e:
             st.error(f"❌ Error: {str(e)}")
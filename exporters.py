@@ -0,0 +1,296 @@
+"""
+Exportación de datos limpios
+El Excel se escribe con xlsxwriter en modo constant_memory: las filas se
+vuelcan a disco por bloques y el libro se genera en un archivo temporal.
+Además de CSV y Excel se ofrecen Parquet, Feather y CSV comprimido.
+Los archivos generados se cachean por dataset y formato.
+"""
+
+import importlib.util
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+import data_cache
+import instrumentation
+import memory_optimizer
+
+# Límites de una hoja de Excel
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_MAX_COLS = 16_384
+
+# Filas convertidas a valores de Python por bloque
+CHUNK_ROWS = 50_000
+
+# Filas muestreadas para calcular el ancho de columna
+WIDTH_SAMPLE_ROWS = 1_000
+MAX_COL_WIDTH = 50
+
+HEADER_FORMAT = {'bold': True, 'bg_color': '#3b82f6', 'font_color': 'white', 'border': 1}
+DATETIME_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+
+# Presupuesto de la caché de archivos exportados (variable de entorno EXCEL_EXPORT_CACHE_MAX_MB)
+EXPORT_CACHE_MAX_MB = int(os.environ.get('EXCEL_EXPORT_CACHE_MAX_MB', '256'))
+
+# Compresión de los CSV comprimidos (mtime fijo: mismo archivo para los mismos datos)
+GZIP_OPTIONS = {'method': 'gzip', 'compresslevel': 6, 'mtime': 0}
+ZSTD_OPTIONS = {'method': 'zstd', 'level': 3}
+
+
+def check_sheet_size(df, sheet_name):
+    """Lanza ValueError si el DataFrame no cabe en una hoja (cabecera incluida)"""
+    if len(df) + 1 > EXCEL_MAX_ROWS:
+        raise ValueError(
+            f"La hoja '{sheet_name}' tiene {len(df):,} filas y Excel admite "
+            f"{EXCEL_MAX_ROWS - 1:,}. Exporta en CSV."
+        )
+    if len(df.columns) > EXCEL_MAX_COLS:
+        raise ValueError(f"La hoja '{sheet_name}' tiene {len(df.columns):,} columnas y Excel admite {EXCEL_MAX_COLS:,}.")
+
+
+def check_excel(df, removed=None):
+    """Valida que los datos y los duplicados quepan en sus hojas"""
+    check_sheet_size(df, 'Datos')
+    if removed is not None and len(removed) > 0:
+        check_sheet_size(removed, 'Duplicados')
+
+
+def column_widths(df, sample_rows=WIDTH_SAMPLE_ROWS):
+    """Ancho por columna a partir de una muestra repartida por todo el DataFrame"""
+    step = max(1, len(df) // sample_rows)
+    sample = df.iloc[::step].head(sample_rows)
+    widths = []
+    for i, col in enumerate(df.columns):
+        values = sample.iloc[:, i]
+        longest = values.astype(str).str.len().max() if len(values) else 0
+        widths.append(min(max(int(longest), len(str(col))) + 2, MAX_COL_WIDTH))
+    return widths
+
+
+def _column_values(series):
+    """Valores de Python listos para xlsxwriter (nulos como None, sin NaN ni NaT)"""
+    missing = series.isna().to_numpy()
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        values = series.array.to_pydatetime()
+    else:
+        values = series.to_numpy(dtype=object)
+    if missing.any():
+        values[missing] = None
+    return values
+
+
+def write_rows(worksheet, df, start_row=1, chunk_rows=CHUNK_ROWS):
+    """Escribe las filas en orden, convirtiendo un bloque de filas a la vez"""
+    row = start_row
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        columns = [_column_values(chunk.iloc[:, i]) for i in range(len(chunk.columns))]
+        for values in zip(*columns):
+            worksheet.write_row(row, 0, values)
+            row += 1
+    return row
+
+
+def write_sheet(workbook, sheet_name, df, header_format, chunk_rows=CHUNK_ROWS):
+    """Hoja con cabecera formateada, anchos de columna y datos"""
+    worksheet = workbook.add_worksheet(sheet_name)
+    for col_num, width in enumerate(column_widths(df)):
+        worksheet.set_column(col_num, col_num, width)
+    # constant_memory exige escribir cada fila completa antes de pasar a la siguiente
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+    write_rows(worksheet, df, 1, chunk_rows)
+    return worksheet
+
+
+def write_excel(df, path, include_stats=False, removed=None, chunk_rows=CHUNK_ROWS):
+    """
+    Escribe el libro en path sin construirlo en memoria
+
+    Hojas: 'Datos', 'Estadísticas' (describe de columnas numéricas) y
+    'Duplicados' (filas eliminadas en la limpieza).
+    """
+    check_excel(df, removed)
+    has_removed = removed is not None and len(removed) > 0
+
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'default_date_format': DATETIME_FORMAT,
+        'nan_inf_to_errors': True,
+        'tmpdir': tempfile.gettempdir(),
+    })
+    try:
+        header_format = workbook.add_format(HEADER_FORMAT)
+        write_sheet(workbook, 'Datos', df, header_format, chunk_rows)
+
+        if include_stats:
+            numeric_df = df.select_dtypes(include=[np.number])
+            if len(numeric_df.columns) > 0:
+                stats = memory_optimizer.widen_floats(numeric_df).describe().reset_index(names='')
+                write_sheet(workbook, 'Estadísticas', stats, header_format)
+
+        if has_removed:
+            write_sheet(workbook, 'Duplicados', removed, header_format, chunk_rows)
+    finally:
+        workbook.close()
+
+
+def _spooled(write, suffix):
+    """Escribe con write(path) en un archivo temporal y devuelve su contenido"""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        path = tmp.name
+    try:
+        write(path)
+        with open(path, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def excel_bytes(df, include_stats=False, removed=None):
+    """Genera el Excel en un archivo temporal y devuelve su contenido"""
+    return _spooled(lambda path: write_excel(df, path, include_stats, removed), '.xlsx')
+
+
+def csv_bytes(df, compression=None):
+    """CSV en UTF-8 con BOM (Excel detecta así los acentos), opcionalmente comprimido"""
+    if compression is None:
+        return df.to_csv(index=False).encode('utf-8-sig')
+    return _spooled(
+        lambda path: df.to_csv(path, index=False, encoding='utf-8-sig', compression=compression), '.csv'
+    )
+
+
+# Texto en Parquet/Feather: 'string' de Arrow (string[pyarrow] se escribiría como large_string)
+TEXT_DTYPE = pd.StringDtype('python')
+
+
+def stable_dtypes(df):
+    """
+    Deshace los tipos reducidos de memory_optimizer para la salida en columnas
+
+    int8/16/32 pasan a int64, float32 a float64 y category / string[pyarrow] a
+    string: el esquema de una columna no cambia de un archivo a otro según
+    sus valores (p. ej. 'Cantidad' int16 un día e int32 al siguiente).
+    """
+    casts = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories.dtype
+            if pd.api.types.is_integer_dtype(categories):
+                casts[col] = 'int64' if not df[col].hasnans else 'float64'
+            elif pd.api.types.is_float_dtype(categories):
+                casts[col] = 'float64'
+            else:
+                casts[col] = TEXT_DTYPE
+        elif isinstance(dtype, pd.StringDtype):
+            casts[col] = TEXT_DTYPE
+        elif pd.api.types.is_integer_dtype(dtype):
+            casts[col] = 'Int64' if isinstance(dtype, pd.api.extensions.ExtensionDtype) else 'int64'
+        elif pd.api.types.is_float_dtype(dtype):
+            casts[col] = 'Float64' if isinstance(dtype, pd.api.extensions.ExtensionDtype) else 'float64'
+    casts = {col: target for col, target in casts.items() if df[col].dtype != target}
+    return df.astype(casts) if casts else df
+
+
+def _columnar(df):
+    """Parquet y Feather exigen nombres de columna de texto y Feather un índice por defecto"""
+    return stable_dtypes(df.rename(columns=str).reset_index(drop=True))
+
+
+def parquet_bytes(df):
+    """Parquet con tipos estables (int64, float64, string, fechas) y compresión zstd"""
+    return _spooled(lambda path: _columnar(df).to_parquet(path, index=False, compression='zstd'), '.parquet')
+
+
+def feather_bytes(df):
+    """Feather (Arrow IPC) con tipos estables, el formato más rápido de volver a cargar con pandas"""
+    return _spooled(lambda path: _columnar(df).to_feather(path), '.feather')
+
+
+# Formatos de exportación: etiqueta del botón, extensión, MIME, generador y módulo requerido
+EXPORT_FORMATS = {
+    'csv': {
+        'label': 'CSV',
+        'ext': 'csv',
+        'mime': 'text/csv',
+        'build': lambda df, removed: csv_bytes(df),
+        'requires': None,
+    },
+    'xlsx': {
+        'label': 'Excel',
+        'ext': 'xlsx',
+        'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'build': lambda df, removed: excel_bytes(df, True, removed),
+        'requires': None,
+    },
+    'parquet': {
+        'label': 'Parquet',
+        'ext': 'parquet',
+        'mime': 'application/vnd.apache.parquet',
+        'build': lambda df, removed: parquet_bytes(df),
+        'requires': 'pyarrow',
+    },
+    'feather': {
+        'label': 'Feather',
+        'ext': 'feather',
+        'mime': 'application/vnd.apache.arrow.file',
+        'build': lambda df, removed: feather_bytes(df),
+        'requires': 'pyarrow',
+    },
+    'csv.gz': {
+        'label': 'CSV (gzip)',
+        'ext': 'csv.gz',
+        'mime': 'application/gzip',
+        'build': lambda df, removed: csv_bytes(df, GZIP_OPTIONS),
+        'requires': None,
+    },
+    'csv.zst': {
+        'label': 'CSV (zstd)',
+        'ext': 'csv.zst',
+        'mime': 'application/zstd',
+        'build': lambda df, removed: csv_bytes(df, ZSTD_OPTIONS),
+        'requires': 'zstandard',
+    },
+}
+
+
+def available_formats():
+    """Formatos cuyas dependencias opcionales están instaladas"""
+    return [
+        fmt for fmt, spec in EXPORT_FORMATS.items()
+        if spec['requires'] is None or importlib.util.find_spec(spec['requires']) is not None
+    ]
+
+
+# Caché propia: los archivos exportados no compiten con los DataFrames de la caché principal
+_artifacts = data_cache.LRUCache(EXPORT_CACHE_MAX_MB * 1024 * 1024)
+
+
+def get_artifact_cache():
+    """Devuelve la caché de archivos exportados"""
+    return _artifacts
+
+
+def get_artifact(fmt, df, dataset_key, removed=None):
+    """
+    Archivo exportado en el formato pedido, generado solo la primera vez
+
+    Se cachea por dataset y formato, así que los reruns y otras sesiones con el
+    mismo archivo reutilizan el resultado.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"fmt debe ser uno de {tuple(EXPORT_FORMATS)}")
+    build = EXPORT_FORMATS[fmt]['build']
+
+    def compute():
+        with instrumentation.stage(f'export_{fmt}', rows_in=len(df)) as record:
+            content = build(df, removed)
+            record['bytes'] = len(content)
+        return content
+
+    return _artifacts.get_or_compute(f'{dataset_key}:export:{fmt}', compute)
@@ -3,14 +3,18 @@ Configuración de Firebase para autenticación Premium
 """
 
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-from datetime import datetime, timedelta
-import uuid
+from datetime import datetime
+
+import license_cache
+import session_tokens
 
 
 def initialize_firebase():
     """Inicializa Firebase (solo una vez)"""
+    # firebase_admin se importa al conectar por primera vez, no al arrancar la app
+    import firebase_admin
+    from firebase_admin import credentials
+
     if not firebase_admin._apps:
         try:
             firebase_creds = st.secrets["firebase"]
@@ -50,78 +54,99 @@ def initialize_firebase():
     return True
 
 
+_client = None
+
+
 def get_firestore_client():
-    """Obtiene cliente de Firestore"""
-    if initialize_firebase():
-        return firestore.client()
-    return None
+    """Obtiene cliente de Firestore (se crea una sola vez por proceso)"""
+    global _client
+    if _client is None and initialize_firebase():
+        from firebase_admin import firestore
+        _client = firestore.client()
+    return _client
+
+
+def validate_license(license_info):
+    """
+    Comprueba que una licencia esté activa y sin expirar
+
+    Returns:
+        tuple: (is_valid, license_info_or_error_message)
+    """
+    if license_info is None:
+        return False, "Código no válido"
+
+    if not license_info.get('isActive', False):
+        return False, "Código desactivado"
+
+    expiry_str = license_info.get('expires', '')
+
+    try:
+        expiry_date = datetime.strptime(expiry_str, '%Y-%m-%d').date()
+
+        if datetime.now().date() > expiry_date:
+            return False, "Código expirado"
+    except Exception:
+        return False, "Error verificando expiración"
+
+    return True, license_info
 
 
 def check_premium_code(code):
     """
     Verifica si un código Premium es válido
-    
+
+    La licencia se lee de la caché compartida (license_cache): solo se consulta
+    Firestore cuando el código no se ha leído en los últimos minutos.
+
     Returns:
         tuple: (is_valid, license_info_or_error_message)
     """
     try:
-        db = get_firestore_client()
-        
-        if db is None:
-            return False, "Error de conexión"
-        
-        code = code.strip().upper()
-        
-        doc_ref = db.collection('premium_codes').document(code)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            return False, "Código no válido"
-        
-        license_info = doc.to_dict()
-        
-        if not license_info.get('isActive', False):
-            return False, "Código desactivado"
-        
-        expiry_str = license_info.get('expires', '')
-        
-        try:
-            expiry_date = datetime.strptime(expiry_str, '%Y-%m-%d').date()
-            
-            if datetime.now().date() > expiry_date:
-                return False, "Código expirado"
-        except Exception:
-            return False, "Error verificando expiración"
-        
-        return True, license_info
-        
+        licenses = license_cache.get_cache()
+        is_valid, result = validate_license(licenses.get(code))
+        if not is_valid and result in ("Código desactivado", "Código expirado"):
+            # La próxima verificación vuelve a leer el documento
+            licenses.invalidate(code)
+        return is_valid, result
+
+    except ConnectionError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Error: {str(e)}"
 
 
+def peek_premium_code(code):
+    """
+    Verifica un código solo si su licencia ya está en caché
+
+    Si no lo está, se lee en segundo plano y se devuelve None; la sesión
+    restaurada desde un token no espera a Firestore.
+
+    Returns:
+        tuple: (is_valid, license_info_or_error_message), o None si aún no se sabe
+    """
+    licenses = license_cache.get_cache()
+    cached, doc = licenses.peek(code)
+    if not cached:
+        licenses.prefetch(code)
+        return None
+    is_valid, result = validate_license(doc)
+    if not is_valid and result in ("Código desactivado", "Código expirado"):
+        licenses.invalidate(code)
+    return is_valid, result
+
+
 def get_license_info(code):
     """
     Obtiene información completa de una licencia
-    
+
     Returns:
         dict: Información de la licencia o None si no existe
     """
     try:
-        db = get_firestore_client()
-        
-        if db is None:
-            return None
-        
-        code = code.strip().upper()
-        
-        doc_ref = db.collection('premium_codes').document(code)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            return None
-        
-        return doc.to_dict()
-        
+        return license_cache.get_cache().get(code)
+
     except Exception as e:
         print(f"Error getting license info: {str(e)}")
         return None
@@ -132,77 +157,32 @@ def get_license_info(code):
 # ==========================================
 
 def create_session_token(user_tier, user_email, license_code, expires, customer_name):
-    """Crea un token de sesión y lo guarda en Firebase"""
-    try:
-        # Generar token único
-        session_token = str(uuid.uuid4())
-        
-        # Datos de la sesión
-        session_data = {
-            'user_tier': user_tier,
-            'user_email': user_email,
-            'license_code': license_code,
-            'expires': expires,
-            'customer_name': customer_name,
-            'created_at': datetime.now().isoformat(),
-            'expires_at': (datetime.now() + timedelta(days=30)).isoformat()
-        }
-        
-        # Guardar en Firebase
-        db = get_firestore_client()
-        if db is None:
-            return None
-            
-        db.collection('sessions').document(session_token).set(session_data)
-        
-        return session_token
-    except Exception as e:
-        print(f"Error creating session: {str(e)}")
-        return None
+    """Crea un token de sesión firmado (ya no se guarda en Firebase; email y nombre salen de la licencia)"""
+    return session_tokens.issue(user_tier, license_code, expires)
 
 
 def get_session_data(session_token):
-    """Recupera los datos de sesión desde Firebase"""
-    try:
-        if not session_token:
-            return None
-        
-        db = get_firestore_client()
-        if db is None:
-            return None
-            
-        doc = db.collection('sessions').document(session_token).get()
-        
-        if not doc.exists:
-            return None
-        
-        session_data = doc.to_dict()
-        
-        # Verificar si la sesión expiró
-        expires_at_str = session_data.get('expires_at', '')
-        if expires_at_str:
-            expires_at = datetime.fromisoformat(expires_at_str)
-            if datetime.now() > expires_at:
-                # Sesión expirada, eliminarla
-                db.collection('sessions').document(session_token).delete()
-                return None
-        
-        return session_data
-    except Exception as e:
-        print(f"Error getting session: {str(e)}")
+    """Recupera los datos de sesión verificando el token y la licencia (caché de licencias)"""
+    claims = session_tokens.verify(session_token)
+    if claims is None:
         return None
+    is_valid, license_info = check_premium_code(claims['code'])
+    if not is_valid:
+        return None
+    return {
+        'user_tier': claims['tier'],
+        'user_email': license_info.get('email', ''),
+        'license_code': claims['code'],
+        'expires': license_info.get('expires', ''),
+        'customer_name': license_info.get('customerName', 'Usuario Premium'),
+        'created_at': datetime.fromtimestamp(claims['iat']).isoformat(),
+        'expires_at': datetime.fromtimestamp(claims['exp']).isoformat(),
+    }
 
 
 def delete_session_token(session_token):
-    """Elimina un token de sesión de Firebase"""
+    """Revoca un token de sesión"""
     try:
-        if not session_token:
-            return
-        
-        db = get_firestore_client()
-        if db is None:
-            return
-            
-        db.collection('sessions').document(session_token).delete()
+        session_tokens.revoke(session_token)
     except Exception as e:
         print(f"Error deleting session: {str(e)}")
@@ -0,0 +1,166 @@
+"""
+Ingesta rápida de archivos CSV y Excel
+- CSV: detecta el dialecto (separador, comillas y encabezado) con una muestra acotada
+  y lee el archivo en una sola pasada con el motor C o pyarrow
+- Excel: prueba motores en orden de velocidad con respaldo al motor por defecto
+"""
+
+import csv
+import importlib.util
+import os
+from io import BytesIO
+
+import pandas as pd
+
+# Tamaño máximo de la muestra usada para detectar el dialecto
+SAMPLE_BYTES = 64 * 1024
+
+# Separadores candidatos (';' es habitual en exportaciones de Excel en español)
+CANDIDATE_DELIMITERS = ',;\t|'
+
+# Motor de lectura: 'c' (por defecto) o 'pyarrow'
+CSV_ENGINE = os.environ.get('EXCEL_CSV_ENGINE', 'c')
+
+# Motores de Excel en orden de preferencia (None = motor por defecto de pandas)
+EXCEL_ENGINES = ('calamine', None)
+
+# Encodings a probar en orden
+ENCODINGS = ('utf-8', 'cp1252')
+
+
+def read_sample(data, encoding='utf-8', errors='replace', size=SAMPLE_BYTES):
+    """Devuelve las primeras líneas completas del archivo como texto"""
+    sample = data[:size]
+    if len(data) > size:
+        # Cortar en el último salto de línea para no dejar una fila a medias
+        cut = sample.rfind(b'\n')
+        if cut > 0:
+            sample = sample[:cut]
+    return sample.decode(encoding, errors=errors)
+
+
+def detect_encoding(data):
+    """Elige el primer encoding capaz de decodificar la muestra"""
+    for encoding in ENCODINGS:
+        try:
+            read_sample(data, encoding, errors='strict')
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return ENCODINGS[-1]
+
+
+def _count_delimiter(lines, delimiter):
+    """Devuelve el número de apariciones del separador si es constante en todas las líneas"""
+    counts = {line.count(delimiter) for line in lines}
+    if len(counts) == 1:
+        return counts.pop()
+    return 0
+
+
+def _is_number(value):
+    try:
+        float(value.replace(',', '.'))
+        return True
+    except ValueError:
+        return False
+
+
+def sniff_dialect(sample):
+    """
+    Detecta separador, carácter de comillas y si la primera fila es encabezado
+
+    Returns:
+        dict: {'sep', 'quotechar', 'header'}
+    """
+    sniffer = csv.Sniffer()
+    try:
+        dialect = sniffer.sniff(sample, delimiters=CANDIDATE_DELIMITERS)
+        sep = dialect.delimiter
+        quotechar = dialect.quotechar or '"'
+    except csv.Error:
+        # Respaldo: el separador que aparece el mismo número de veces en cada línea
+        lines = [line for line in sample.splitlines()[:50] if line.strip()]
+        scores = {d: _count_delimiter(lines, d) for d in CANDIDATE_DELIMITERS}
+        sep = max(scores, key=scores.get) if any(scores.values()) else ','
+        quotechar = '"'
+
+    # Solo se asume que no hay encabezado si la primera fila tiene valores numéricos
+    # y el sniffer no lo reconoce como encabezado
+    header = 0
+    rows = list(csv.reader(sample.splitlines()[:2], delimiter=sep, quotechar=quotechar))
+    if rows and any(_is_number(value) for value in rows[0] if value.strip()):
+        try:
+            if not sniffer.has_header(sample):
+                header = None
+        except csv.Error:
+            pass
+
+    return {'sep': sep, 'quotechar': quotechar, 'header': header}
+
+
+def read_csv(data, engine=None):
+    """
+    Lee un CSV desde bytes en una sola pasada
+
+    Returns:
+        tuple: (DataFrame, info_de_lectura)
+    """
+    encoding = detect_encoding(data)
+    dialect = sniff_dialect(read_sample(data, encoding))
+    engine = engine or CSV_ENGINE
+
+    kwargs = {
+        'sep': dialect['sep'],
+        'quotechar': dialect['quotechar'],
+        'header': dialect['header'],
+        'encoding': encoding,
+    }
+    try:
+        df = pd.read_csv(BytesIO(data), engine=engine, **kwargs)
+    except UnicodeDecodeError:
+        # Caracteres no UTF-8 fuera de la muestra
+        encoding = ENCODINGS[-1]
+        kwargs['encoding'] = encoding
+        df = pd.read_csv(BytesIO(data), engine=engine, **kwargs)
+    except Exception:
+        if engine == 'c':
+            raise
+        # Respaldo al motor C si pyarrow no soporta el archivo
+        return read_csv(data, engine='c')
+
+    info = dict(dialect, encoding=encoding, engine=engine)
+    return df, info
+
+
+def engine_available(engine):
+    """Indica si el paquete de un motor de Excel está instalado"""
+    if engine is None:
+        return True
+    module = {'calamine': 'python_calamine'}.get(engine, engine)
+    return importlib.util.find_spec(module) is not None
+
+
+def read_excel(data, engines=EXCEL_ENGINES):
+    """
+    Lee la primera hoja de un Excel probando los motores en orden
+
+    calamine (Rust) es varias veces más rápido que openpyxl; si no está instalado
+    o falla con el archivo, se usa el motor por defecto de pandas
+    (openpyxl en modo read_only para .xlsx, xlrd para .xls).
+
+    Returns:
+        tuple: (DataFrame, info_de_lectura)
+    """
+    errors = {}
+    for engine in engines:
+        if not engine_available(engine):
+            continue
+        try:
+            df = pd.read_excel(BytesIO(data), engine=engine)
+            return df, {'engine': engine or 'default', 'fallback_errors': errors}
+        except Exception as e:
+            if engine is None:
+                raise
+            errors[engine] = str(e)
+    raise ValueError("No hay motor de Excel disponible")
@@ -0,0 +1,28 @@
+"""
+Insights automáticos sobre el dataset limpio
+Sin dependencias de Streamlit: los usa la app y el procesamiento por lotes
+"""
+
+import outliers
+
+# Columnas con outliers listadas una por una
+MAX_OUTLIER_INSIGHTS = 5
+
+
+def generate_insights(df, profile, outlier_summary=None):
+    """Lista de mensajes con los problemas encontrados en los datos"""
+    insights = []
+    null_cols = profile.null_cols
+    if null_cols:
+        insights.append(f"⚠️ {len(null_cols)} columnas con valores faltantes")
+    dup_count = profile.duplicate_count
+    if dup_count > 0:
+        insights.append(f"🔄 {dup_count} filas duplicadas ({(dup_count/len(df)*100):.1f}%)")
+    if outlier_summary is None:
+        outlier_summary = outliers.detect(df, profile.numeric_cols, 'iqr', quantiles=profile.quantiles).summary()
+    with_outliers = outlier_summary[outlier_summary['Outliers'] > 0].sort_values('Outliers', ascending=False, kind='stable')
+    for _, row in with_outliers.head(MAX_OUTLIER_INSIGHTS).iterrows():
+        insights.append(f"📊 '{row['Columna']}': {row['Outliers']} outliers detectados")
+    if len(with_outliers) > MAX_OUTLIER_INSIGHTS:
+        insights.append(f"📊 {len(with_outliers) - MAX_OUTLIER_INSIGHTS} columnas más con outliers (ver pestaña Explorar)")
+    return insights if insights else ["✅ Datos sin problemas significativos"]
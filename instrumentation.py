@@ -0,0 +1,119 @@
+"""
+Instrumentación por etapa del pipeline
+Cada etapa registra tiempo, filas de entrada/salida y variación de memoria;
+los registros se emiten como líneas JSON por logging y se guardan en el
+registrador activo para mostrarlos en el panel de rendimiento
+"""
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger('excel_automator.perf')
+
+# Nivel del log de rendimiento (EXCEL_PERF_LOG=WARNING lo silencia)
+LOG_LEVEL = os.environ.get('EXCEL_PERF_LOG', 'INFO').upper()
+
+# Con EXCEL_PERF_TRACEMALLOC=1 se activa tracemalloc (más preciso, pero más lento)
+USE_TRACEMALLOC = os.environ.get('EXCEL_PERF_TRACEMALLOC', '0') == '1'
+
+_current = contextvars.ContextVar('perf_recorder', default=None)
+
+
+class Recorder:
+    """Acumula los registros de las etapas ejecutadas en un contexto"""
+
+    def __init__(self, **context):
+        # Campos añadidos a cada registro (p. ej. el nombre del archivo)
+        self.context = context
+        self.records = []
+
+    def table(self):
+        return timings_table(self.records)
+
+
+def timings_table(records):
+    """Registros como DataFrame para el panel de rendimiento"""
+    table = pd.DataFrame(records, columns=['stage', 'seconds', 'rows_in', 'rows_out', 'mem_delta_mb'])
+    return table.astype({'rows_in': 'Int64', 'rows_out': 'Int64'})
+
+
+def configure_logging(stream=None):
+    """Añade un handler al logger de rendimiento (una sola vez por proceso)"""
+    if USE_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if logger.handlers:
+        return logger
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    return logger
+
+
+def _rss_mb():
+    """Memoria residente del proceso en MB (None si no se puede leer)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    except ImportError:
+        return None
+
+
+def _memory_mb():
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0] / 1024 ** 2
+    return _rss_mb()
+
+
+@contextmanager
+def recording(**context):
+    """Activa un registrador para las etapas ejecutadas dentro del bloque (por hilo)"""
+    recorder = Recorder(**context)
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name, rows_in=None, **fields):
+    """
+    Mide una etapa; el llamador puede fijar record['rows_out'] dentro del bloque
+
+    Uso:
+        with instrumentation.stage('dedup', rows_in=len(df)) as record:
+            df = ...
+            record['rows_out'] = len(df)
+    """
+    recorder = _current.get()
+    context = recorder.context if recorder is not None else {}
+    record = {'stage': name, 'rows_in': rows_in, 'rows_out': None, **context, **fields}
+    mem_before = _memory_mb()
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        record['seconds'] = round(time.perf_counter() - start, 4)
+        mem_after = _memory_mb()
+        record['mem_delta_mb'] = None if mem_before is None or mem_after is None else round(mem_after - mem_before, 2)
+        if recorder is not None:
+            recorder.records.append(record)
+        logger.info(json.dumps({'event': 'stage', **record}, ensure_ascii=False, default=str))
@@ -0,0 +1,246 @@
+"""
+Caché de licencias Premium con TTL compartida por todas las sesiones del proceso
+Las lecturas de varias sesiones que arrancan a la vez se agrupan en una sola
+consulta al backend (Firestore o un almacén en memoria para pruebas sin red)
+"""
+
+import json
+import os
+import threading
+import time
+
+# Segundos que una licencia leída se considera vigente (EXCEL_LICENSE_TTL_S)
+LICENSE_TTL_S = float(os.environ.get('EXCEL_LICENSE_TTL_S', '300'))
+
+# Los códigos inexistentes se recuerdan menos tiempo (p. ej. una compra recién hecha)
+NEGATIVE_TTL_S = float(os.environ.get('EXCEL_LICENSE_NEGATIVE_TTL_S', '30'))
+
+# Ventana en la que se juntan las lecturas concurrentes en un solo lote
+BATCH_WINDOW_S = 0.02
+
+# Espera máxima de una sesión por el lote de otra
+FETCH_TIMEOUT_S = 10.0
+
+COLLECTION = 'premium_codes'
+
+
+def normalize_code(code):
+    return code.strip().upper()
+
+
+class FirestoreBackend:
+    """Lee documentos de la colección de códigos con db.get_all (una ida y vuelta por lote)"""
+
+    def __init__(self, client_factory, collection=COLLECTION):
+        self.client_factory = client_factory
+        self.collection = collection
+
+    def get_many(self, codes):
+        db = self.client_factory()
+        if db is None:
+            raise ConnectionError("Error de conexión")
+        refs = [db.collection(self.collection).document(code) for code in codes]
+        found = {code: None for code in codes}
+        for snapshot in db.get_all(refs):
+            if snapshot.exists:
+                found[snapshot.id] = snapshot.to_dict()
+        return found
+
+
+class InMemoryBackend:
+    """Sustituto de Firestore en memoria; cuenta las lecturas para las pruebas"""
+
+    def __init__(self, docs=None):
+        self.docs = {normalize_code(code): dict(doc) for code, doc in (docs or {}).items()}
+        self.batches = 0
+        self.reads = 0
+
+    @classmethod
+    def from_file(cls, path):
+        """Carga {código: documento} desde un JSON"""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def set(self, code, doc):
+        self.docs[normalize_code(code)] = dict(doc)
+
+    def get_many(self, codes):
+        self.batches += 1
+        self.reads += len(codes)
+        return {code: dict(self.docs[code]) if code in self.docs else None for code in codes}
+
+
+class _Fetch:
+    """Lectura pendiente de un código, compartida por las sesiones que lo esperan"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.doc = None
+        self.error = None
+
+
+class LicenseCache:
+    """
+    Documentos de licencia por código con expiración por TTL
+
+    get() devuelve el documento (o None si no existe). Si no está en caché, la
+    sesión se une al lote pendiente: la primera en llegar espera BATCH_WINDOW_S,
+    lee todos los códigos pendientes de una vez y despierta a las demás.
+    """
+
+    def __init__(self, backend, ttl=LICENSE_TTL_S, negative_ttl=NEGATIVE_TTL_S,
+                 batch_window=BATCH_WINDOW_S, clock=time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.batch_window = batch_window
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._pending = set()
+        self._inflight = {}
+        self._batch_open = False
+        self._lock = threading.Lock()
+
+    def _fresh(self, code):
+        entry = self._entries.get(code)
+        if entry is not None and entry[1] > self.clock():
+            return entry
+        return None
+
+    def _store(self, found):
+        now = self.clock()
+        for code, doc in found.items():
+            self._entries[code] = (doc, now + (self.ttl if doc is not None else self.negative_ttl))
+
+    def get(self, code):
+        """Documento de la licencia o None si el código no existe"""
+        code = normalize_code(code)
+        with self._lock:
+            entry = self._fresh(code)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            fetch = self._inflight.get(code)
+            added = fetch is None
+            if added:
+                fetch = self._inflight[code] = _Fetch()
+                self._pending.add(code)
+            # Solo abre un lote quien añadió un código; si ya se está leyendo, se espera
+            leader = added and not self._batch_open
+            if leader:
+                self._batch_open = True
+
+        if leader:
+            self._run_batch()
+        if not fetch.done.wait(FETCH_TIMEOUT_S):
+            raise TimeoutError("Tiempo de espera agotado verificando la licencia")
+        if fetch.error is not None:
+            raise fetch.error
+        return fetch.doc
+
+    def _run_batch(self):
+        time.sleep(self.batch_window)
+        with self._lock:
+            batch = sorted(self._pending)
+            self._pending = set()
+            self._batch_open = False
+        if not batch:
+            return
+        try:
+            found, error = self.backend.get_many(batch), None
+        except Exception as e:
+            found, error = {}, e
+        with self._lock:
+            if error is None:
+                self._store(found)
+            for code in batch:
+                fetch = self._inflight.pop(code)
+                fetch.doc = found.get(code)
+                fetch.error = error
+                fetch.done.set()
+
+    def peek(self, code):
+        """
+        Documento en caché sin consultar el backend
+
+        Returns:
+            tuple: (está en caché, documento o None)
+        """
+        with self._lock:
+            entry = self._fresh(normalize_code(code))
+        return (False, None) if entry is None else (True, entry[0])
+
+    def prefetch(self, code):
+        """Lee el código en segundo plano si no está en caché (no espera al backend)"""
+        if self.peek(code)[0]:
+            return
+
+        def fetch():
+            try:
+                self.get(code)
+            except Exception:
+                pass
+
+        threading.Thread(target=fetch, name='license-prefetch', daemon=True).start()
+
+    def get_many(self, codes):
+        """Varios códigos a la vez: los que faltan se leen en una sola consulta"""
+        codes = [normalize_code(code) for code in codes]
+        with self._lock:
+            missing = [code for code in codes if self._fresh(code) is None]
+        if missing:
+            found = self.backend.get_many(missing)
+            with self._lock:
+                self._store(found)
+        with self._lock:
+            return {code: self._entries[code][0] if code in self._entries else None for code in codes}
+
+    def invalidate(self, code):
+        """Olvida un código (p. ej. licencia expirada o desactivada)"""
+        with self._lock:
+            self._entries.pop(normalize_code(code), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def _default_backend():
+    """
+    Backend según EXCEL_LICENSE_BACKEND: 'firestore' (por defecto) o 'memory'
+
+    Con 'memory' los códigos se cargan de EXCEL_LICENSE_FILE (JSON) si está definido.
+    """
+    if os.environ.get('EXCEL_LICENSE_BACKEND', 'firestore') == 'memory':
+        path = os.environ.get('EXCEL_LICENSE_FILE')
+        return InMemoryBackend.from_file(path) if path else InMemoryBackend()
+    import firebase_config
+    return FirestoreBackend(firebase_config.get_firestore_client)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Devuelve la caché de licencias del proceso (se crea en el primer uso)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LicenseCache(_default_backend())
+        return _cache
+
+
+def set_backend(backend, **kwargs):
+    """Reemplaza la caché del proceso por una nueva sobre otro backend (pruebas, desarrollo local)"""
+    global _cache
+    with _cache_lock:
+        _cache = LicenseCache(backend, **kwargs)
+        return _cache
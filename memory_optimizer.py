@@ -0,0 +1,98 @@
+"""
+Optimización de memoria de DataFrames cargados
+Reduce tipos sin cambiar los valores: la exportación CSV/Excel sigue siendo idéntica
+Las estadísticas (describe, cuantiles) se calculan sobre widen_floats(df)
+"""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+# Proporción máxima de valores únicos para convertir texto a 'category'
+CATEGORY_MAX_RATIO = 0.5
+
+# Los enteros hasta 2**24 se representan exactamente en float32
+FLOAT32_EXACT_LIMIT = 2 ** 24
+
+
+def arrow_strings_available():
+    """Indica si pyarrow está instalado para usar strings respaldados por Arrow"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _downcast_float(series):
+    """Pasa a float32 solo si todos los valores son enteros exactos (mismo texto al exportar)"""
+    values = series.to_numpy()
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return series
+    if np.all(finite == np.round(finite)) and np.abs(finite).max() <= FLOAT32_EXACT_LIMIT:
+        return series.astype('float32')
+    return series
+
+
+def _optimize_text(series, category_max_ratio):
+    """Texto de baja cardinalidad a 'category'; el resto a strings de Arrow"""
+    if pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        return series
+    non_null = series.notna().sum()
+    if non_null == 0:
+        return series
+    if series.nunique() / non_null <= category_max_ratio:
+        return series.astype('category')
+    if arrow_strings_available():
+        return series.astype('string[pyarrow]')
+    return series
+
+
+def optimize_memory(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    """
+    Reduce la memoria del DataFrame
+
+    - Enteros: al tipo entero más pequeño que los contiene
+    - Decimales: a float32 solo cuando todos los valores son enteros exactos
+    - Texto: 'category' si hay pocos valores distintos, si no string[pyarrow]
+
+    Returns:
+        tuple: (df_optimizado, reporte)
+    """
+    before = int(df.memory_usage(index=True, deep=True).sum())
+    optimized = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            new = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series.dtype):
+            new = _downcast_float(series)
+        elif series.dtype == 'object':
+            new = _optimize_text(series, category_max_ratio)
+        else:
+            continue
+        if new.dtype != series.dtype:
+            optimized[col] = new
+
+    if optimized:
+        df = df.copy(deep=False)
+        for col, values in optimized.items():
+            df[col] = values
+
+    after = int(df.memory_usage(index=True, deep=True).sum())
+    report = {
+        'before': before,
+        'after': after,
+        'converted': {col: str(series.dtype) for col, series in optimized.items()},
+    }
+    return df, report
+
+
+
+def widen_floats(df):
+    """
+    Vuelve a float64 las columnas float32
+
+    Los valores son los mismos, pero describe() o quantile() calculan en el
+    tipo de la columna: en float32 la media o la desviación cambiarían.
+    """
+    narrow = {col: 'float64' for col, dtype in df.dtypes.items() if dtype == np.float32}
+    return df.astype(narrow) if narrow else df
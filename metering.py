@@ -0,0 +1,275 @@
+"""
+Medición de uso diario compartida por todas las sesiones del proceso
+Los contadores viven en memoria (incremento y comprobación atómicos en O(1))
+y se persisten en segundo plano por lotes al backend (Firestore o un
+almacén en memoria para pruebas sin red)
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import date
+
+# Segundos entre escrituras al backend (EXCEL_USAGE_FLUSH_S)
+FLUSH_INTERVAL_S = float(os.environ.get('EXCEL_USAGE_FLUSH_S', '30'))
+
+# Incrementos pendientes que fuerzan una escritura antes del intervalo
+FLUSH_BATCH_SIZE = 200
+
+# Espera máxima de una sesión por la lectura inicial de una clave hecha por otra
+LOAD_TIMEOUT_S = 10.0
+
+# Segundos antes de reintentar la lectura inicial de una clave que falló
+LOAD_RETRY_S = 30.0
+
+# Escrituras por lote de Firestore (máximo 500)
+WRITE_BATCH_SIZE = 400
+
+COLLECTION = 'usage_daily'
+
+
+def today():
+    return date.today().isoformat()
+
+
+def _doc_id(key, day):
+    # Los ids de Firestore no admiten '/'
+    return f"{day}_{key}".replace('/', '_')
+
+
+class FirestoreUsageBackend:
+    """Un documento por clave y día; los incrementos usan firestore.Increment en un lote"""
+
+    def __init__(self, client_factory, collection=COLLECTION):
+        self.client_factory = client_factory
+        self.collection = collection
+
+    def _db(self):
+        db = self.client_factory()
+        if db is None:
+            raise ConnectionError("Error de conexión")
+        return db
+
+    def load(self, key, day):
+        snapshot = self._db().collection(self.collection).document(_doc_id(key, day)).get()
+        return (snapshot.to_dict() or {}).get('count', 0) if snapshot.exists else 0
+
+    def add_many(self, deltas):
+        """deltas: {(clave, día): incremento}, como mucho WRITE_BATCH_SIZE claves (un lote)"""
+        from firebase_admin import firestore
+        db = self._db()
+        batch = db.batch()
+        for (key, day), delta in deltas.items():
+            ref = db.collection(self.collection).document(_doc_id(key, day))
+            batch.set(ref, {'key': key, 'day': day, 'count': firestore.Increment(delta)}, merge=True)
+        batch.commit()
+
+
+class InMemoryUsageBackend:
+    """Sustituto de Firestore en memoria; cuenta lecturas y escrituras para las pruebas"""
+
+    def __init__(self):
+        self.counts = {}
+        self.loads = 0
+        self.writes = 0
+
+    def load(self, key, day):
+        self.loads += 1
+        return self.counts.get((key, day), 0)
+
+    def add_many(self, deltas):
+        self.writes += 1
+        for slot, delta in deltas.items():
+            self.counts[slot] = self.counts.get(slot, 0) + delta
+
+
+class UsageMeter:
+    """
+    Contadores diarios por clave (licencia, email o IP del cliente)
+
+    El primer acceso a una clave en el día lee su valor del backend fuera del
+    lock (solo esperan las sesiones de esa misma clave); a partir de ahí
+    increment() y count() solo tocan memoria. Los incrementos se
+    acumulan y un hilo los escribe cada flush_interval segundos o al juntar
+    flush_batch_size pendientes.
+
+    Si la lectura tarda más de LOAD_TIMEOUT_S o falla, los usos de la clave se
+    cuentan aparte (_unloaded) y no se escriben hasta que la lectura llega;
+    entonces se suman al valor del backend, así que no se regala cupo.
+    """
+
+    def __init__(self, backend, flush_interval=FLUSH_INTERVAL_S, flush_batch_size=FLUSH_BATCH_SIZE,
+                 day=today, background=True):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self.day = day
+        self._counts = {}
+        self._unloaded = {}
+        self._load_failed = {}
+        self._loading = {}
+        self._pending = {}
+        self._pending_total = 0
+        self._current_day = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        if background:
+            threading.Thread(target=self._flush_loop, name='usage-flush', daemon=True).start()
+
+    def _slot(self, key):
+        """
+        (clave, día), cargado en memoria si el backend respondió
+
+        La lectura al backend se hace sin el lock del medidor: la primera
+        sesión de la clave la hace y las demás de esa clave esperan su evento.
+        Tras un fallo no se reintenta hasta pasados LOAD_RETRY_S segundos.
+        """
+        day = self.day()
+        slot = (key, day)
+        with self._lock:
+            if day != self._current_day:
+                # Cambio de día: los contadores anteriores ya no se consultan
+                self._counts = {s: n for s, n in self._counts.items() if s[1] == day}
+                self._unloaded = {s: n for s, n in self._unloaded.items() if s[1] == day}
+                self._load_failed = {s: t for s, t in self._load_failed.items() if s[1] == day}
+                self._current_day = day
+            if slot in self._counts:
+                return slot
+            loading = self._loading.get(slot)
+            leader = loading is None
+            if leader:
+                failed_at = self._load_failed.get(slot)
+                if failed_at is not None and time.monotonic() - failed_at < LOAD_RETRY_S:
+                    return slot
+                loading = self._loading[slot] = threading.Event()
+
+        if not leader:
+            loading.wait(LOAD_TIMEOUT_S)
+            return slot
+        try:
+            value = self.backend.load(key, day)
+        except Exception:
+            # Sin conexión se cuenta aparte hasta que la lectura funcione
+            value = None
+        with self._lock:
+            if value is None:
+                self._load_failed[slot] = time.monotonic()
+            else:
+                self._load_failed.pop(slot, None)
+                self._counts[slot] = value + self._unloaded.pop(slot, 0)
+            del self._loading[slot]
+        loading.set()
+        return slot
+
+    def count(self, key):
+        """Usos de hoy de la clave"""
+        slot = self._slot(key)
+        with self._lock:
+            if slot in self._counts:
+                return self._counts[slot]
+            return self._unloaded.get(slot, 0)
+
+    def increment(self, key, limit=None, amount=1):
+        """
+        Suma amount si no se supera el límite (comprobación e incremento atómicos)
+
+        Returns:
+            tuple: (permitido, usos de hoy después de la operación)
+        """
+        slot = self._slot(key)
+        with self._lock:
+            # Se comprueba bajo el lock si la clave quedó cargada (la espera pudo agotarse)
+            counts = self._counts if slot in self._counts else self._unloaded
+            current = counts.get(slot, 0)
+            if limit is not None and current + amount > limit:
+                return False, current
+            counts[slot] = current + amount
+            self._pending[slot] = self._pending.get(slot, 0) + amount
+            self._pending_total += amount
+            if self._pending_total >= self.flush_batch_size:
+                self._wake.set()
+            return True, current + amount
+
+    def flush(self, include_unloaded=False):
+        """
+        Escribe los incrementos pendientes en lotes de WRITE_BATCH_SIZE claves
+
+        Los de claves sin cargar se guardan hasta que su lectura funcione
+        (salvo include_unloaded, al cerrar el proceso), para que esa lectura no
+        los cuente dos veces.
+
+        Returns:
+            int: claves escritas
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, held = {}, {}
+                for slot, delta in self._pending.items():
+                    target = held if slot in self._unloaded and not include_unloaded else pending
+                    target[slot] = delta
+                self._pending, self._pending_total = held, sum(held.values())
+            slots = list(pending)
+            written = 0
+            for start in range(0, len(slots), WRITE_BATCH_SIZE):
+                chunk = {slot: pending[slot] for slot in slots[start:start + WRITE_BATCH_SIZE]}
+                try:
+                    self.backend.add_many(chunk)
+                except Exception:
+                    # Los lotes no escritos vuelven a la cola para el próximo intento
+                    with self._lock:
+                        for slot in slots[start:]:
+                            self._pending[slot] = self._pending.get(slot, 0) + pending[slot]
+                            self._pending_total += pending[slot]
+                    break
+                written += len(chunk)
+            return written
+
+    def _flush_loop(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        self.flush(include_unloaded=True)
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self._counts), 'pending': self._pending_total}
+
+
+def _default_backend():
+    """Backend según EXCEL_USAGE_BACKEND: 'firestore' (por defecto) o 'memory'"""
+    if os.environ.get('EXCEL_USAGE_BACKEND', 'firestore') == 'memory':
+        return InMemoryUsageBackend()
+    import firebase_config
+    return FirestoreUsageBackend(firebase_config.get_firestore_client)
+
+
+_meter = None
+_meter_lock = threading.Lock()
+
+
+def get_meter():
+    """Medidor de uso del proceso (se crea en el primer uso)"""
+    global _meter
+    with _meter_lock:
+        if _meter is None:
+            _meter = UsageMeter(_default_backend())
+            atexit.register(_meter.close)
+        return _meter
+
+
+def set_backend(backend, **kwargs):
+    """Reemplaza el medidor del proceso por uno nuevo sobre otro backend (pruebas, desarrollo local)"""
+    global _meter
+    with _meter_lock:
+        if _meter is not None:
+            _meter.close()
+        _meter = UsageMeter(backend, **kwargs)
+        return _meter
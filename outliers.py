@@ -0,0 +1,105 @@
+"""
+Detección vectorizada de outliers en todas las columnas numéricas
+Los límites se calculan con una sola llamada por estadístico y se devuelven
+máscaras booleanas en lugar de copias filtradas del DataFrame
+"""
+
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+
+METHODS = ('iqr', 'zscore', 'mad')
+
+DEFAULT_THRESHOLDS = {'iqr': 1.5, 'zscore': 3.0, 'mad': 3.5}
+
+METHOD_NAMES = {'iqr': 'IQR', 'zscore': 'Z-score', 'mad': 'MAD'}
+
+# Constante del z-score modificado (Iglewicz y Hoaglin)
+MAD_SCALE = 0.6745
+
+
+@dataclass
+class OutlierResult:
+    """Máscaras y límites por columna"""
+    method: str
+    threshold: float
+    masks: pd.DataFrame
+    lower: pd.Series
+    upper: pd.Series
+
+    @property
+    def counts(self):
+        return self.masks.sum()
+
+    def summary(self):
+        """Tabla con límites y número de outliers por columna"""
+        return pd.DataFrame({
+            'Columna': self.masks.columns,
+            'Límite inferior': self.lower.values,
+            'Límite superior': self.upper.values,
+            'Outliers': self.counts.values,
+        })
+
+
+def bounds(values, method='iqr', threshold=None, q1=None, q3=None):
+    """
+    Límites inferior y superior por columna de una matriz filas x columnas
+
+    Con method='iqr' se pueden pasar los cuartiles ya calculados (p. ej. del perfil).
+    """
+    if method not in METHODS:
+        raise ValueError(f"method debe ser uno de {METHODS}")
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    with warnings.catch_warnings():
+        # Columnas sin valores: los límites quedan en NaN y no marcan outliers
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if method == 'iqr':
+            if q1 is None or q3 is None:
+                q1, q3 = np.nanpercentile(values, [25, 75], axis=0)
+            iqr = q3 - q1
+            return q1 - threshold * iqr, q3 + threshold * iqr
+        if method == 'zscore':
+            mean = np.nanmean(values, axis=0)
+            std = np.nanstd(values, axis=0)
+            return mean - threshold * std, mean + threshold * std
+        median = np.nanmedian(values, axis=0)
+        mad = np.nanmedian(np.abs(values - median), axis=0)
+        # Con MAD 0 el z-score modificado no está definido: sin outliers
+        spread = np.where(mad > 0, threshold * mad / MAD_SCALE, np.nan)
+        return median - spread, median + spread
+
+
+def detect(df, columns=None, method='iqr', threshold=None, quantiles=None):
+    """Detecta outliers en todas las columnas numéricas a la vez"""
+    if columns is None:
+        columns = df.select_dtypes(include=[np.number]).columns.tolist()
+    columns = list(columns)
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    values = df[columns].to_numpy(dtype='float64', na_value=np.nan)
+    q1 = q3 = None
+    if method == 'iqr' and quantiles is not None and set(columns) <= set(quantiles.columns):
+        q1 = quantiles.loc[0.25, columns].to_numpy(dtype='float64')
+        q3 = quantiles.loc[0.75, columns].to_numpy(dtype='float64')
+    lower, upper = bounds(values, method, threshold, q1, q3)
+    with np.errstate(invalid='ignore'):
+        masks = (values < lower) | (values > upper)
+    index = pd.Index(columns)
+    return OutlierResult(
+        method=method,
+        threshold=threshold,
+        masks=pd.DataFrame(masks, index=df.index, columns=index),
+        lower=pd.Series(lower, index=index),
+        upper=pd.Series(upper, index=index),
+    )
+
+
+def get_summary(df, columns, method, dataset_key, quantiles=None):
+    """Resumen por columna cacheado por dataset (sin las máscaras, que ocupan n x columnas)"""
+    key = f'{dataset_key}:outliers:{method}:{tuple(columns)!r}'
+    return data_cache.get_cache().get_or_compute(
+        key, lambda: detect(df, columns, method, quantiles=quantiles).summary()
+    )
@@ -0,0 +1,332 @@
+"""
+Pipeline de carga y limpieza de archivos
+Sin dependencias de Streamlit: recibe bytes y devuelve el DataFrame limpio con su reporte
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+import admission
+import data_cache
+import dedup
+import date_inference
+import exporters
+import ingest
+import insights
+import instrumentation
+import memory_optimizer
+import profiling
+import streaming
+
+# Opciones por defecto del pipeline de limpieza
+DEFAULT_OPTIONS = {
+    'drop_empty': True,
+    'sort_by_date': True,
+    'strip_text': True,
+    'drop_duplicates': True,
+    'optimize_memory': True,
+    'dedup_subset': None,
+    'dedup_keep': 'first',
+}
+
+# Columna que identifica el archivo de origen al combinar varios archivos
+SOURCE_COLUMN = '_archivo'
+
+# Archivos procesados a la vez en una subida múltiple (EXCEL_UPLOAD_WORKERS)
+UPLOAD_WORKERS = int(os.environ.get('EXCEL_UPLOAD_WORKERS', '4'))
+
+# CSV por encima de este tamaño se limpian por bloques (EXCEL_STREAMING_THRESHOLD_MB)
+STREAMING_THRESHOLD_MB = int(os.environ.get('EXCEL_STREAMING_THRESHOLD_MB', '100'))
+
+# Disco total de los resultados por bloques cacheados (EXCEL_STREAMING_CACHE_MAX_MB);
+# al desalojar un resultado su directorio temporal se borra
+STREAMING_CACHE_MAX_MB = int(os.environ.get('EXCEL_STREAMING_CACHE_MAX_MB', '2048'))
+
+
+@dataclass
+class ProcessedUpload:
+    """Resultado de procesar un archivo subido"""
+    df: pd.DataFrame
+    report: dict = field(default_factory=dict)
+    profile: profiling.DatasetProfile = None
+    removed: pd.DataFrame = None
+    key: str = ''
+
+
+def resolve_options(options=None):
+    """Combina las opciones recibidas con las opciones por defecto"""
+    resolved = dict(DEFAULT_OPTIONS)
+    if options:
+        resolved.update(options)
+    return resolved
+
+
+def is_csv(file_name):
+    """Indica si el archivo es CSV por su extensión (sin distinguir mayúsculas: DATOS.CSV)"""
+    return file_name.lower().endswith('.csv')
+
+
+def read_file(data, file_name):
+    """
+    Lee un archivo CSV o Excel desde bytes
+
+    Returns:
+        tuple: (DataFrame, info_de_lectura)
+    """
+    if is_csv(file_name):
+        df, info = ingest.read_csv(data)
+        df.columns = df.columns.astype(str).str.strip().str.replace('"', '').str.replace("'", "")
+        return df, info
+    return ingest.read_excel(data)
+
+
+def strip_text(df):
+    """Quita espacios al inicio y final de las columnas de texto (devuelve un DataFrame nuevo)"""
+    text_cols = df.select_dtypes(include=['object']).columns
+    return df.assign(**{col: df[col].str.strip() for col in text_cols})
+
+
+def clean_dataframe(df, options=None):
+    """
+    Aplica la limpieza automática
+
+    Returns:
+        tuple: (df_limpio, reporte, filas_duplicadas_eliminadas, hashes_de_fila)
+    """
+    options = resolve_options(options)
+    initial_stats = {'rows': len(df), 'cols': len(df.columns)}
+
+    if options['drop_empty']:
+        with instrumentation.stage('drop_empty', rows_in=len(df)) as record:
+            df = df.dropna(axis=1, how='all').dropna(how='all')
+            record['rows_out'] = len(df)
+
+    with instrumentation.stage('dates', rows_in=len(df)) as record:
+        df, date_cols, date_formats = date_inference.parse_dates(df)
+        record['rows_out'] = len(df)
+
+    sorted_by = None
+    if date_cols and options['sort_by_date']:
+        sorted_by = date_cols[0]
+        with instrumentation.stage('sort', rows_in=len(df)) as record:
+            df = df.sort_values(by=sorted_by, ascending=True).reset_index(drop=True)
+            record['rows_out'] = len(df)
+
+    if options['strip_text']:
+        with instrumentation.stage('strip', rows_in=len(df)) as record:
+            df = strip_text(df)
+            record['rows_out'] = len(df)
+
+    with instrumentation.stage('dedup', rows_in=len(df)) as record:
+        if options['drop_duplicates']:
+            df, removed, hashes = dedup.drop_duplicates(df, options['dedup_subset'], options['dedup_keep'])
+        else:
+            removed, hashes = df.iloc[0:0], dedup.row_hashes(df)
+        record['rows_out'] = len(df)
+
+    report = {
+        'initial_stats': initial_stats,
+        'final_stats': {'rows': len(df), 'cols': len(df.columns)},
+        'date_cols': date_cols,
+        'date_formats': date_formats,
+        'sorted_by': sorted_by,
+        'duplicates_removed': len(removed),
+        'dedup_subset': dedup.valid_subset(df, options['dedup_subset']),
+    }
+    return df, report, removed, hashes
+
+
+def process_upload(data, file_name, options=None):
+    """
+    Lee y limpia un archivo sin usar la caché
+
+    Los tiempos de cada etapa quedan en report['timings'].
+    """
+    options = resolve_options(options)
+    with instrumentation.recording(file=file_name) as recorder:
+        with instrumentation.stage('read', bytes=len(data)) as record:
+            df, read_info = read_file(data, file_name)
+            record['rows_out'] = len(df)
+        df, report, removed, hashes = clean_dataframe(df, options)
+        report['read_info'] = read_info
+        if options['optimize_memory']:
+            with instrumentation.stage('memory', rows_in=len(df)) as record:
+                df, report['memory'] = memory_optimizer.optimize_memory(df)
+                record['rows_out'] = len(df)
+        with instrumentation.stage('profile', rows_in=len(df)):
+            profile = profiling.build_profile(df, hashes)
+    report['timings'] = recorder.records
+    return ProcessedUpload(df=df, report=report, profile=profile, removed=removed)
+
+
+def run_pipeline(data, file_name, options=None, formats=('csv',)):
+    """
+    Pipeline completo sin Streamlit: lectura, limpieza, perfil, insights y exportación
+
+    Returns:
+        tuple: (ProcessedUpload, {formato: bytes}); los insights quedan en report['insights']
+    """
+    result = process_upload(data, file_name, options)
+    result.report['insights'] = insights.generate_insights(result.df, result.profile)
+    exports = {
+        fmt: exporters.EXPORT_FORMATS[fmt]['build'](result.df, result.removed)
+        for fmt in formats
+    }
+    return result, exports
+
+
+def load_upload(data, file_name, options=None, reserve_mb=None):
+    """
+    Lee y limpia un archivo usando la caché del proceso
+
+    La clave combina el hash del contenido con las opciones del pipeline, así que
+    un rerun sobre el mismo archivo devuelve el resultado ya procesado.
+    El DataFrame devuelto es compartido: no debe modificarse en sitio.
+
+    Con reserve_mb, el procesamiento (no los aciertos de caché) reserva esa
+    memoria en el presupuesto del proceso y lanza admission.BudgetExceeded si no cabe.
+    """
+    options = resolve_options(options)
+    key = data_cache.make_key(data, file_name=file_name, **options)
+
+    def compute():
+        with admission.get_budget().hold(reserve_mb or 0):
+            result = process_upload(data, file_name, options)
+        result.key = key
+        return result
+
+    return data_cache.get_cache().get_or_compute(key, compute)
+
+
+_streaming_results = data_cache.LRUCache(STREAMING_CACHE_MAX_MB * 1024 * 1024)
+
+
+def get_streaming_cache():
+    """Devuelve la caché de resultados por bloques (limitada por bytes en disco)"""
+    return _streaming_results
+
+
+def load_upload_streaming(data, file_name, options=None):
+    """Limpia un CSV grande por bloques usando su propia caché (el resultado vive en disco)"""
+    options = resolve_options(options)
+    key = data_cache.make_key(data, file_name=file_name, mode='streaming', **options)
+
+    def compute():
+        with instrumentation.recording(file=file_name) as recorder:
+            with instrumentation.stage('streaming_clean', bytes=len(data)) as record:
+                result = streaming.clean_csv_streaming(data, options=options)
+                record['rows_in'] = result.report['initial_stats']['rows']
+                record['rows_out'] = result.report['final_stats']['rows']
+        result.report['timings'] = recorder.records
+        result.key = key
+        return result
+
+    cache = get_streaming_cache()
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.put(key, result, nbytes=result.store.nbytes)
+    return result
+
+
+def load_uploads(files, options=None, max_workers=UPLOAD_WORKERS, reserve_mb=None):
+    """
+    Procesa varios archivos a la vez en un pool de hilos (lectura y limpieza
+    liberan el GIL en pandas, pyarrow y calamine)
+
+    Args:
+        files: lista de tuplas (id, bytes, nombre_de_archivo); el id distingue
+            archivos con el mismo nombre
+        reserve_mb: {id: MB a reservar} (ver load_upload)
+
+    Returns:
+        tuple: ({id: ProcessedUpload}, {id: mensaje_de_error}) en el orden recibido
+    """
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            (file_id, pool.submit(load_upload, data, name, options, (reserve_mb or {}).get(file_id)))
+            for file_id, data, name in files
+        ]
+        for file_id, future in futures:
+            try:
+                results[file_id] = future.result()
+            except Exception as e:
+                errors[file_id] = str(e)
+    return results, errors
+
+
+def merge_results(results, options=None, labels=None):
+    """
+    Concatena los archivos ya limpios alineando columnas por nombre y elimina los
+    duplicados entre archivos (sin tener en cuenta la columna de origen)
+
+    Args:
+        results: {id: ProcessedUpload}
+        labels: {id: nombre a mostrar en la columna de origen} (por defecto el id)
+
+    Returns:
+        ProcessedUpload: con report['files'] = filas por archivo
+    """
+    options = resolve_options(options)
+    labels = labels or {}
+    frames = [
+        result.df.assign(**{SOURCE_COLUMN: labels.get(file_id, file_id)})
+        for file_id, result in results.items()
+    ]
+    merged = pd.concat(frames, ignore_index=True, sort=False)
+    # La columna de origen va primero
+    merged = merged[[SOURCE_COLUMN] + [c for c in merged.columns if c != SOURCE_COLUMN]]
+    initial_rows = len(merged)
+
+    if options['drop_duplicates']:
+        subset = options['dedup_subset'] or [c for c in merged.columns if c != SOURCE_COLUMN]
+        merged, removed, _ = dedup.drop_duplicates(merged, subset, options['dedup_keep'])
+        merged = merged.reset_index(drop=True)
+    else:
+        removed = merged.iloc[0:0]
+
+    report = {
+        'initial_stats': {'rows': initial_rows, 'cols': len(merged.columns)},
+        'final_stats': {'rows': len(merged), 'cols': len(merged.columns)},
+        'date_cols': sorted({c for r in results.values() for c in r.report['date_cols']}),
+        'sorted_by': None,
+        'duplicates_removed': len(removed),
+        'dedup_subset': dedup.valid_subset(merged, options['dedup_subset']),
+        'files': {labels.get(file_id, file_id): len(result.df) for file_id, result in results.items()},
+    }
+    if options['optimize_memory']:
+        # Las categorías con valores distintos entre archivos vuelven a object al concatenar
+        merged, report['memory'] = memory_optimizer.optimize_memory(merged)
+    profile = profiling.build_profile(merged)
+    return ProcessedUpload(df=merged, report=report, profile=profile, removed=removed)
+
+
+def load_merged(results, options=None, labels=None):
+    """Combinación de varios archivos usando la caché del proceso"""
+    options = resolve_options(options)
+    labels = labels or {}
+    key = data_cache.make_key(
+        '|'.join(f'{labels.get(file_id, file_id)}={result.key}' for file_id, result in results.items()).encode('utf-8'),
+        mode='merged', **options,
+    )
+
+    def compute():
+        with instrumentation.recording() as recorder:
+            with instrumentation.stage('merge', files=len(results)) as record:
+                merged = merge_results(results, options, labels)
+                record['rows_in'] = merged.report['initial_stats']['rows']
+                record['rows_out'] = len(merged.df)
+        merged.report['timings'] = recorder.records
+        merged.key = key
+        return merged
+
+    return data_cache.get_cache().get_or_compute(key, compute)
+
+
+def use_streaming(file_name, size_bytes):
+    """Indica si un archivo debe procesarse por bloques"""
+    return is_csv(file_name) and size_bytes > STREAMING_THRESHOLD_MB * 1024 * 1024
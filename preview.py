@@ -0,0 +1,63 @@
+"""
+Vista previa paginada del dataset cacheado
+Solo se envía al navegador la página visible; el orden por columna usa un argsort cacheado
+"""
+
+import numpy as np
+
+import data_cache
+
+# Filas por página
+PAGE_SIZE = 100
+
+
+def page_count(total, page_size=PAGE_SIZE):
+    """Número de páginas (al menos una)"""
+    return max(1, -(-total // page_size))
+
+
+def sort_order(df, column, ascending, dataset_key):
+    """
+    Posiciones de las filas ordenadas por una columna (nulos al final)
+
+    Se calcula una vez por dataset, columna y sentido, y se comparte entre reruns.
+    Las columnas con tipos mezclados (p. ej. números y texto) se ordenan como texto.
+    """
+    def compute():
+        series = df[column].reset_index(drop=True)
+        try:
+            ordered = series.sort_values(ascending=ascending, kind='stable', na_position='last')
+        except TypeError:
+            text = series.astype(str).where(series.notna())
+            ordered = text.sort_values(ascending=ascending, kind='stable', na_position='last')
+        return ordered.index.to_numpy()
+
+    key = f'{dataset_key}:order:{column!r}:{ascending}'
+    return data_cache.get_cache().get_or_compute(key, compute)
+
+
+def filter_order(order, row_ids):
+    """Aplica un orden a un subconjunto de filas (p. ej. resultados de búsqueda)"""
+    mask = np.zeros(len(order), dtype=bool)
+    mask[row_ids] = True
+    return order[mask[order]]
+
+
+def get_page(df, page=1, page_size=PAGE_SIZE, order=None, row_ids=None):
+    """
+    Devuelve una página del DataFrame (page empieza en 1)
+
+    Sin orden ni filtro es un slice posicional (vista, sin copiar); con orden o
+    filtro solo se copian las filas de la página.
+    """
+    start = (page - 1) * page_size
+    stop = start + page_size
+    if order is None and row_ids is None:
+        return df.iloc[start:stop]
+    if order is None:
+        positions = row_ids
+    elif row_ids is None:
+        positions = order
+    else:
+        positions = filter_order(order, row_ids)
+    return df.take(positions[start:stop])
@@ -0,0 +1,110 @@
+"""
+Perfil del dataset calculado una sola vez y compartido por todas las pestañas
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import dedup
+import memory_optimizer
+
+# Cuantiles precalculados para columnas numéricas
+PROFILE_QUANTILES = [0.25, 0.5, 0.75]
+
+
+@dataclass
+class DatasetProfile:
+    """Estadísticas por columna del DataFrame limpio"""
+    n_rows: int
+    n_cols: int
+    dtypes: pd.Series
+    null_counts: pd.Series
+    unique_counts: pd.Series
+    row_hashes: np.ndarray
+    duplicate_mask: np.ndarray
+    numeric_cols: list
+    quantiles: pd.DataFrame
+    memory_usage: pd.Series
+
+    @property
+    def duplicate_count(self):
+        return int(self.duplicate_mask.sum())
+
+    @property
+    def null_cols(self):
+        return self.null_counts.index[self.null_counts > 0].tolist()
+
+    @property
+    def completeness(self):
+        cells = self.n_rows * self.n_cols
+        if cells == 0:
+            return 100.0
+        return 100 - (self.null_counts.sum() / cells * 100)
+
+    @property
+    def memory_bytes(self):
+        return int(self.memory_usage.sum())
+
+    def column_table(self):
+        """Tabla de tipos, únicos y nulos para la pestaña Explorar"""
+        return pd.DataFrame({
+            'Columna': self.dtypes.index,
+            'Tipo': self.dtypes.astype(str).values,
+            'Únicos': self.unique_counts.values,
+            'Nulos': self.null_counts.values,
+        })
+
+    def to_dict(self):
+        """Perfil serializable a JSON (sin los hashes de fila)"""
+        columns = []
+        for col in self.dtypes.index:
+            entry = {
+                'name': str(col),
+                'dtype': str(self.dtypes[col]),
+                'nulls': int(self.null_counts[col]),
+                'unique': int(self.unique_counts[col]),
+            }
+            if col in self.numeric_cols:
+                entry['quantiles'] = {
+                    str(q): None if pd.isna(v) else float(v) for q, v in self.quantiles[col].items()
+                }
+            columns.append(entry)
+        return {
+            'rows': self.n_rows,
+            'cols': self.n_cols,
+            'completeness': float(self.completeness),
+            'duplicates': self.duplicate_count,
+            'memory_bytes': self.memory_bytes,
+            'columns': columns,
+        }
+
+
+def build_profile(df, row_hashes=None):
+    """
+    Calcula el perfil del dataset en una pasada vectorizada
+
+    Si el llamador ya tiene los hashes de fila (p. ej. de la limpieza),
+    se reutilizan para la máscara de duplicados en lugar de recalcularlos.
+    """
+    if row_hashes is None:
+        row_hashes = dedup.row_hashes(df)
+    duplicate_mask = dedup.duplicate_mask(row_hashes)
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    if numeric_cols:
+        quantiles = memory_optimizer.widen_floats(df[numeric_cols]).quantile(PROFILE_QUANTILES)
+    else:
+        quantiles = pd.DataFrame(index=PROFILE_QUANTILES)
+    return DatasetProfile(
+        n_rows=len(df),
+        n_cols=len(df.columns),
+        dtypes=df.dtypes,
+        null_counts=df.isna().sum(),
+        unique_counts=df.nunique(),
+        row_hashes=row_hashes,
+        duplicate_mask=duplicate_mask,
+        numeric_cols=numeric_cols,
+        quantiles=quantiles,
+        memory_usage=df.memory_usage(index=False, deep=True),
+    )
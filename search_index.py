@@ -0,0 +1,72 @@
+"""
+Índice de búsqueda para la Vista Previa
+Se construye una vez por dataset limpio: una cadena en minúsculas por fila con
+todas sus columnas, sobre la que se buscan subcadenas sin copiar el DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+import memory_optimizer
+
+# Separador entre columnas (no aparece en texto normal, evita coincidencias entre celdas)
+SEPARATOR = '\x1f'
+
+# Resultados por página
+PAGE_SIZE = 50
+
+
+class SearchIndex:
+    """Índice de subcadenas sobre filas concatenadas"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        # Última búsqueda: si la nueva consulta la contiene, solo se revisan sus resultados
+        self._last = ('', None)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query):
+        """Devuelve los índices posicionales de las filas que contienen la consulta"""
+        query = query.lower()
+        if not query:
+            return np.arange(len(self.rows))
+        last_query, last_ids = self._last
+        if last_ids is not None and last_query and last_query in query:
+            candidates = self.rows.iloc[last_ids]
+            ids = last_ids[candidates.str.contains(query, regex=False).to_numpy(dtype=bool, na_value=False)]
+        else:
+            mask = self.rows.str.contains(query, regex=False)
+            ids = np.flatnonzero(mask.to_numpy(dtype=bool, na_value=False))
+        self._last = (query, ids)
+        return ids
+
+    def page(self, query, page=1, page_size=PAGE_SIZE):
+        """
+        Página de resultados (page empieza en 1)
+
+        Returns:
+            tuple: (ids_de_la_pagina, total_de_coincidencias)
+        """
+        ids = self.search(query)
+        start = (page - 1) * page_size
+        return ids[start:start + page_size], len(ids)
+
+
+def build_index(df):
+    """Concatena las columnas de cada fila en minúsculas"""
+    if len(df.columns) == 0:
+        return SearchIndex(pd.Series([''] * len(df), dtype=object))
+    parts = [df[col].astype(str).str.lower() for col in df.columns]
+    rows = parts[0].str.cat(parts[1:], sep=SEPARATOR).reset_index(drop=True)
+    # Con pyarrow la búsqueda de subcadenas corre en C++ sobre el arreglo completo
+    if memory_optimizer.arrow_strings_available():
+        rows = rows.astype('string[pyarrow]')
+    return SearchIndex(rows)
+
+
+def get_index(df, dataset_key):
+    """Índice cacheado por dataset (compartido entre reruns y sesiones)"""
+    return data_cache.get_cache().get_or_compute(f'{dataset_key}:search', lambda: build_index(df))
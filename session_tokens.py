@@ -0,0 +1,336 @@
+"""
+Tokens de sesión firmados con HMAC
+El token lleva el tier, el código de licencia y la expiración, y se verifica
+localmente sin consultar Firestore; al restaurar la sesión la licencia se
+comprueba en la caché de licencias. No lleva datos personales (email, nombre):
+se obtienen de la licencia. Los tokens revocados (cierre de sesión) se
+comparten entre procesos con una lista que se sincroniza periódicamente.
+
+Uso (tareas de mantenimiento):
+    python session_tokens.py new-secret
+    python session_tokens.py purge [--all] [--dry-run]
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Vigencia de una sesión (igual que las sesiones guardadas en Firestore)
+SESSION_DAYS = 30
+
+# Segundos entre sincronizaciones de la lista de revocación (EXCEL_REVOCATION_SYNC_S)
+REVOCATION_SYNC_S = float(os.environ.get('EXCEL_REVOCATION_SYNC_S', '60'))
+
+# Margen al pedir revocaciones nuevas (relojes de distintos procesos)
+SYNC_OVERLAP_S = 5
+
+REVOKED_COLLECTION = 'revoked_sessions'
+LEGACY_COLLECTION = 'sessions'
+
+# Operaciones por lote de escritura de Firestore (máximo 500)
+PURGE_BATCH_SIZE = 400
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def get_secret():
+    """
+    Clave de firma: st.secrets['session_secret'] o EXCEL_SESSION_SECRET
+
+    Sin clave los tokens quedan desactivados y la sesión se restaura con el código.
+    """
+    secret = os.environ.get('EXCEL_SESSION_SECRET')
+    if not secret:
+        try:
+            import streamlit as st
+            secret = st.secrets.get('session_secret')
+        except Exception:
+            secret = None
+    return secret.encode('utf-8') if secret else None
+
+
+def _sign(payload, secret):
+    return hmac.new(secret, payload, hashlib.sha256).digest()
+
+
+def issue(user_tier, license_code, expires, days=SESSION_DAYS, secret=None, now=None):
+    """
+    Crea un token firmado
+
+    Returns:
+        str: el token, o None si no hay clave de firma configurada
+    """
+    secret = secret or get_secret()
+    if secret is None:
+        return None
+    now = time.time() if now is None else now
+    claims = {
+        'jti': secrets.token_urlsafe(12),
+        'iat': int(now),
+        'exp': int(now + days * 86400),
+        'tier': user_tier,
+        'code': license_code,
+        'lic_exp': expires,
+    }
+    payload = json.dumps(claims, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload, secret))}"
+
+
+def decode(token, secret=None, now=None):
+    """
+    Verifica firma y expiración (sin consultar la lista de revocación)
+
+    Returns:
+        dict: los datos del token, o None si no es válido
+    """
+    secret = secret or get_secret()
+    if secret is None or not token or token.count('.') != 1:
+        return None
+    try:
+        payload_b64, signature_b64 = token.split('.')
+        payload = _b64decode(payload_b64)
+        if not hmac.compare_digest(_sign(payload, secret), _b64decode(signature_b64)):
+            return None
+        claims = json.loads(payload)
+    except (ValueError, TypeError):
+        return None
+
+    now = time.time() if now is None else now
+    if claims.get('exp', 0) < now:
+        return None
+    # La licencia puede vencer antes que la sesión
+    try:
+        if datetime.fromtimestamp(now).date() > datetime.strptime(claims.get('lic_exp', ''), '%Y-%m-%d').date():
+            return None
+    except ValueError:
+        return None
+    return claims
+
+
+def verify(token, secret=None, now=None):
+    """Datos del token si es válido y no fue revocado; None en otro caso"""
+    claims = decode(token, secret, now)
+    if claims is None or get_revocations().is_revoked(claims['jti']):
+        return None
+    return claims
+
+
+def revoke(token, secret=None):
+    """Revoca un token válido (cierre de sesión); devuelve True si se revocó"""
+    claims = decode(token, secret)
+    if claims is None:
+        return False
+    get_revocations().add(claims['jti'], claims['exp'])
+    return True
+
+
+class FirestoreRevocations:
+    """Revocaciones en Firestore: un documento por token con su fecha de revocación"""
+
+    def __init__(self, client_factory, collection=REVOKED_COLLECTION):
+        self.client_factory = client_factory
+        self.collection = collection
+
+    def add(self, jti, exp, revoked_at):
+        db = self.client_factory()
+        if db is None:
+            raise ConnectionError("Error de conexión")
+        db.collection(self.collection).document(jti).set({'exp': exp, 'revoked_at': revoked_at})
+
+    def fetch_since(self, since):
+        """{jti: exp} revocados después de since (segundos epoch)"""
+        db = self.client_factory()
+        if db is None:
+            raise ConnectionError("Error de conexión")
+        query = db.collection(self.collection).where('revoked_at', '>', since)
+        return {doc.id: doc.to_dict().get('exp', 0) for doc in query.stream()}
+
+
+class InMemoryRevocations:
+    """Sustituto en memoria para pruebas sin red"""
+
+    def __init__(self):
+        self.docs = {}
+        self.fetches = 0
+
+    def add(self, jti, exp, revoked_at):
+        self.docs[jti] = {'exp': exp, 'revoked_at': revoked_at}
+
+    def fetch_since(self, since):
+        self.fetches += 1
+        return {jti: doc['exp'] for jti, doc in self.docs.items() if doc['revoked_at'] > since}
+
+
+class RevocationList:
+    """
+    Copia local de los tokens revocados
+
+    is_revoked() es una búsqueda en un set; si la copia tiene más de
+    sync_interval segundos, un solo hilo la actualiza con las revocaciones
+    nuevas mientras los demás siguen usando la copia actual.
+    """
+
+    def __init__(self, backend, sync_interval=REVOCATION_SYNC_S, clock=time.time):
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self._revoked = {}
+        self._last_sync = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def sync(self):
+        """Trae las revocaciones nuevas y descarta las de tokens ya expirados"""
+        if not self._sync_lock.acquire(blocking=self._last_sync is None):
+            return
+        try:
+            now = self.clock()
+            since = 0 if self._last_sync is None else self._last_sync - SYNC_OVERLAP_S
+            try:
+                fresh = self.backend.fetch_since(since)
+            except Exception:
+                # Sin conexión se sigue con la copia local; _last_sync no avanza para
+                # que el próximo intento pida también lo revocado durante el corte
+                with self._lock:
+                    self._failed_at = now
+                return
+            with self._lock:
+                self._revoked.update(fresh)
+                self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp >= now}
+                self._last_sync = now
+                self._failed_at = None
+        finally:
+            self._sync_lock.release()
+
+    def _sync_due(self):
+        now = self.clock()
+        if self._failed_at is not None:
+            # Tras un fallo se reintenta al cumplirse el intervalo, no en cada consulta
+            return now - self._failed_at > self.sync_interval
+        return self._last_sync is None or now - self._last_sync > self.sync_interval
+
+    def is_revoked(self, jti):
+        if self._sync_due():
+            self.sync()
+        with self._lock:
+            return jti in self._revoked
+
+    def add(self, jti, exp):
+        with self._lock:
+            self._revoked[jti] = exp
+        self.backend.add(jti, exp, self.clock())
+
+
+def _default_backend():
+    """Backend según EXCEL_SESSION_BACKEND: 'firestore' (por defecto) o 'memory'"""
+    if os.environ.get('EXCEL_SESSION_BACKEND', 'firestore') == 'memory':
+        return InMemoryRevocations()
+    import firebase_config
+    return FirestoreRevocations(firebase_config.get_firestore_client)
+
+
+_revocations = None
+_revocations_lock = threading.Lock()
+
+
+def get_revocations():
+    """Lista de revocación del proceso (se crea en el primer uso)"""
+    global _revocations
+    with _revocations_lock:
+        if _revocations is None:
+            _revocations = RevocationList(_default_backend())
+        return _revocations
+
+
+def set_backend(backend, **kwargs):
+    """Reemplaza la lista de revocación del proceso (pruebas, desarrollo local)"""
+    global _revocations
+    with _revocations_lock:
+        _revocations = RevocationList(backend, **kwargs)
+        return _revocations
+
+
+def _delete_in_batches(db, refs, batch_size=PURGE_BATCH_SIZE):
+    batch, pending = db.batch(), 0
+    for ref in refs:
+        batch.delete(ref)
+        pending += 1
+        if pending == batch_size:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+
+def purge_legacy_sessions(db, expired_only=True, dry_run=False, now=None, batch_size=PURGE_BATCH_SIZE):
+    """
+    Borra documentos de la colección antigua de sesiones en lotes de escritura
+
+    Con expired_only=False borra todas (los tokens firmados ya no las usan).
+    También borra las revocaciones de tokens que ya expiraron.
+
+    Returns:
+        dict: {'sessions': borradas, 'revocations': borradas}
+    """
+    now = datetime.now() if now is None else now
+    stale_sessions = []
+    for doc in db.collection(LEGACY_COLLECTION).stream():
+        expires_at = (doc.to_dict() or {}).get('expires_at', '')
+        try:
+            expired = datetime.fromisoformat(expires_at) < now
+        except (TypeError, ValueError):
+            expired = True
+        if expired or not expired_only:
+            stale_sessions.append(doc.reference)
+
+    stale_revocations = [
+        doc.reference for doc in db.collection(REVOKED_COLLECTION).where('exp', '<', now.timestamp()).stream()
+    ]
+
+    if not dry_run:
+        _delete_in_batches(db, stale_sessions, batch_size)
+        _delete_in_batches(db, stale_revocations, batch_size)
+    return {'sessions': len(stale_sessions), 'revocations': len(stale_revocations)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mantenimiento de sesiones")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('new-secret', help="Genera una clave para session_secret")
+    purge = commands.add_parser('purge', help="Borra sesiones antiguas de Firestore")
+    purge.add_argument('--all', action='store_true', help="Borrar también las sesiones no expiradas")
+    purge.add_argument('--dry-run', action='store_true', help="Solo contar, sin borrar")
+    args = parser.parse_args(argv)
+
+    if args.command == 'new-secret':
+        print(secrets.token_urlsafe(32))
+        return 0
+
+    import firebase_config
+    db = firebase_config.get_firestore_client()
+    if db is None:
+        print("No se pudo conectar con Firestore", file=sys.stderr)
+        return 1
+    counts = purge_legacy_sessions(db, expired_only=not args.all, dry_run=args.dry_run)
+    action = "a borrar" if args.dry_run else "borradas"
+    print(f"Sesiones {action}: {counts['sessions']} · revocaciones {action}: {counts['revocations']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
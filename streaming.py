@@ -0,0 +1,218 @@
+"""
+Limpieza por bloques para CSV más grandes que la memoria
+Aplica los mismos pasos que pipeline.clean_dataframe bloque a bloque y guarda
+el resultado en un almacén temporal en disco
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from dataclasses import dataclass, field
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import dedup
+import ingest
+
+# Filas por bloque
+CHUNK_ROWS = 100_000
+
+
+class ChunkStore:
+    """Almacén temporal en disco de bloques limpios (se borra al liberar el objeto)"""
+
+    def __init__(self, directory=None):
+        self.path = tempfile.mkdtemp(prefix='excel_stream_', dir=directory)
+        self.parts = []
+        self.rows = 0
+        # Bytes ocupados en disco (para el presupuesto de la caché de resultados por bloques)
+        self.nbytes = 0
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.path, True)
+
+    def append(self, chunk):
+        """Guarda un bloque en disco"""
+        part = os.path.join(self.path, f'part-{len(self.parts):05d}.pkl')
+        chunk.to_pickle(part)
+        self.parts.append(part)
+        self.nbytes += os.path.getsize(part)
+        self.rows += len(chunk)
+
+    def iter_chunks(self, columns=None):
+        """Recorre los bloques guardados"""
+        for part in self.parts:
+            chunk = pd.read_pickle(part)
+            yield chunk[columns] if columns is not None else chunk
+
+    def head(self, n=100, columns=None):
+        """Primeras n filas sin cargar todo el almacén"""
+        frames = []
+        remaining = n
+        for chunk in self.iter_chunks(columns):
+            frames.append(chunk.head(remaining))
+            remaining -= len(frames[-1])
+            if remaining <= 0:
+                break
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def to_csv(self, path, columns=None, **kwargs):
+        """Escribe el almacén completo a un CSV bloque a bloque"""
+        header = True
+        mode = 'w'
+        for chunk in self.iter_chunks(columns):
+            chunk.to_csv(path, mode=mode, header=header, index=False, **kwargs)
+            header = False
+            mode = 'a'
+            # El BOM solo va al principio del archivo
+            if kwargs.get('encoding') == 'utf-8-sig':
+                kwargs['encoding'] = 'utf-8'
+        if header:
+            pd.DataFrame(columns=columns).to_csv(path, index=False, **kwargs)
+
+    def filter_parts(self, masks):
+        """Se queda en cada bloque con las filas de su máscara (reescribe los archivos)"""
+        self.rows = 0
+        self.nbytes = 0
+        for part, mask in zip(self.parts, masks):
+            chunk = pd.read_pickle(part)[mask].reset_index(drop=True)
+            chunk.to_pickle(part)
+            self.rows += len(chunk)
+            self.nbytes += os.path.getsize(part)
+
+    def cleanup(self):
+        """Borra los archivos temporales"""
+        self._finalizer()
+
+
+@dataclass
+class StreamingResult:
+    """Resultado de la limpieza por bloques"""
+    store: ChunkStore
+    columns: list
+    report: dict = field(default_factory=dict)
+    key: str = ''
+    _csv_path: str = field(default=None, repr=False)
+    _csv_lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def head(self, n=100):
+        return self.store.head(n, self.columns)
+
+    def csv_path(self):
+        """
+        CSV completo (UTF-8 con BOM) junto a los bloques
+
+        Se escribe la primera vez que se pide y se reutiliza mientras el
+        resultado siga en caché; se borra con el almacén.
+        """
+        with self._csv_lock:
+            if self._csv_path is None:
+                path = os.path.join(self.store.path, 'export.csv')
+                self.store.to_csv(path, self.columns, encoding='utf-8-sig')
+                self._csv_path = path
+        return self._csv_path
+
+
+def _unseen(hashes, seen, keep):
+    """
+    Filas que se conservan de un bloque y hashes vistos actualizados
+
+    seen es un arreglo ordenado con los hashes conservados en bloques anteriores.
+    """
+    mask = ~dedup.duplicate_mask(hashes, keep)
+    if len(seen):
+        pos = np.searchsorted(seen, hashes).clip(max=len(seen) - 1)
+        mask &= seen[pos] != hashes
+    # Mezcla de dos secuencias ordenadas: timsort la resuelve en tiempo lineal
+    seen = np.sort(np.concatenate([seen, np.sort(hashes[mask])]), kind='stable')
+    return mask, seen
+
+
+def clean_csv_streaming(data, chunk_rows=CHUNK_ROWS, options=None, store_dir=None):
+    """
+    Lee un CSV por bloques y aplica la limpieza sin materializar el archivo completo
+
+    - Filas vacías y espacios en texto: por bloque
+    - Duplicados: entre bloques, con un arreglo ordenado de hashes de fila.
+      Con dedup_keep='last' los hashes de cada bloque se guardan y, al final,
+      se recorren del último bloque al primero y se filtra el almacén
+    - Columnas vacías: se detectan de forma incremental y se excluyen al final
+    La conversión y el ordenamiento por fecha no se aplican en este modo.
+    """
+    options = options or {}
+    keep_last = options.get('drop_duplicates', True) and options.get('dedup_keep', 'first') == 'last'
+    encoding = ingest.detect_encoding(data)
+    dialect = ingest.sniff_dialect(ingest.read_sample(data, encoding))
+
+    reader = pd.read_csv(
+        BytesIO(data),
+        sep=dialect['sep'],
+        quotechar=dialect['quotechar'],
+        header=dialect['header'],
+        encoding=encoding,
+        chunksize=chunk_rows,
+    )
+
+    store = ChunkStore(store_dir)
+    seen = np.empty(0, dtype=np.uint64)
+    columns = None
+    non_empty = set()
+    initial_rows = 0
+    duplicates_removed = 0
+    part_hashes = []
+
+    for chunk in reader:
+        if columns is None:
+            chunk.columns = chunk.columns.astype(str).str.strip().str.replace('"', '').str.replace("'", "")
+            columns = list(chunk.columns)
+        else:
+            chunk.columns = columns
+        initial_rows += len(chunk)
+
+        non_empty.update(chunk.columns[chunk.notna().any()])
+        if options.get('drop_empty', True):
+            chunk = chunk.dropna(how='all')
+
+        if options.get('strip_text', True):
+            for col in chunk.select_dtypes(include=['object']).columns:
+                chunk[col] = chunk[col].str.strip()
+
+        if options.get('drop_duplicates', True) and len(chunk):
+            subset = dedup.valid_subset(chunk, options.get('dedup_subset'))
+            hashes = dedup.row_hashes(chunk, subset, unify_numeric=True)
+            if not keep_last:
+                keep, seen = _unseen(hashes, seen, 'first')
+                duplicates_removed += int((~keep).sum())
+                chunk = chunk[keep]
+
+        if len(chunk):
+            store.append(chunk.reset_index(drop=True))
+            if keep_last:
+                part_hashes.append(hashes)
+
+    if keep_last and part_hashes:
+        masks = []
+        for hashes in reversed(part_hashes):
+            keep, seen = _unseen(hashes, seen, 'last')
+            masks.append(keep)
+        masks.reverse()
+        duplicates_removed = sum(int((~keep).sum()) for keep in masks)
+        store.filter_parts(masks)
+
+    columns = columns or []
+    kept = [c for c in columns if c in non_empty] if options.get('drop_empty', True) else columns
+
+    report = {
+        'initial_stats': {'rows': initial_rows, 'cols': len(columns)},
+        'final_stats': {'rows': store.rows, 'cols': len(kept)},
+        'date_cols': [],
+        'sorted_by': None,
+        'duplicates_removed': duplicates_removed,
+        'chunks': len(store.parts),
+        'read_info': dict(dialect, encoding=encoding, engine='c', chunk_rows=chunk_rows),
+    }
+    return StreamingResult(store=store, columns=kept, report=report)
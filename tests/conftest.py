@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos de la app están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Reloj controlado por la prueba: devuelve now (segundos o un día ISO)"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Reloj en segundos que la prueba avanza con clock.now += n"""
+    return FakeClock(1000.0)
+
+
+@pytest.fixture
+def fake_day():
+    """Día actual para el medidor de uso; se cambia con fake_day.now = '2026-01-02'"""
+    return FakeClock('2026-01-01')
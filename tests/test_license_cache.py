@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+import license_cache
+
+ACTIVE = {'isActive': True, 'expires': '2099-12-31', 'email': 'a@example.com'}
+
+
+def make_cache(docs=None, **kwargs):
+    backend = license_cache.InMemoryBackend(docs or {})
+    kwargs.setdefault('batch_window', 0)
+    return backend, license_cache.LicenseCache(backend, **kwargs)
+
+
+def test_get_normalizes_code_and_caches():
+    backend, cache = make_cache({'abc-1': ACTIVE})
+    assert cache.get(' abc-1 ') == ACTIVE
+    assert cache.get('ABC-1') == ACTIVE
+    assert backend.reads == 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_entry_expires_after_ttl(clock):
+    backend, cache = make_cache({'ABC': ACTIVE}, ttl=60, clock=clock)
+    cache.get('ABC')
+    clock.now += 59
+    cache.get('ABC')
+    assert backend.reads == 1
+
+    backend.set('ABC', dict(ACTIVE, isActive=False))
+    clock.now += 2
+    assert cache.get('ABC')['isActive'] is False
+    assert backend.reads == 2
+
+
+def test_missing_code_uses_negative_ttl(clock):
+    backend, cache = make_cache(ttl=300, negative_ttl=30, clock=clock)
+    assert cache.get('NEW') is None
+    backend.set('NEW', ACTIVE)
+    clock.now += 29
+    assert cache.get('NEW') is None
+    clock.now += 2
+    assert cache.get('NEW') == ACTIVE
+
+
+def test_invalidate_forces_reread():
+    backend, cache = make_cache({'ABC': ACTIVE})
+    cache.get('ABC')
+    cache.invalidate('abc')
+    cache.get('ABC')
+    assert backend.reads == 2
+
+
+def test_concurrent_gets_collapse_into_one_batch():
+    codes = [f'CODE-{i % 5}' for i in range(20)]
+    backend, cache = make_cache({code: ACTIVE for code in codes}, batch_window=0.05)
+    start = threading.Barrier(len(codes))
+    results = [None] * len(codes)
+
+    def worker(i):
+        start.wait()
+        results[i] = cache.get(codes[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(codes))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [ACTIVE] * len(codes)
+    assert backend.batches == 1
+    assert backend.reads == 5
+
+
+def test_backend_error_reaches_every_waiter_and_is_not_cached():
+    class Failing(license_cache.InMemoryBackend):
+        fail = True
+
+        def get_many(self, codes):
+            if self.fail:
+                raise ConnectionError("Error de conexión")
+            return super().get_many(codes)
+
+    backend = Failing({'ABC': ACTIVE})
+    cache = license_cache.LicenseCache(backend, batch_window=0)
+    with pytest.raises(ConnectionError):
+        cache.get('ABC')
+    backend.fail = False
+    assert cache.get('ABC') == ACTIVE
+
+
+def test_get_many_reads_only_missing_codes():
+    backend, cache = make_cache({'A': ACTIVE, 'B': ACTIVE})
+    cache.get('A')
+    assert cache.get_many(['a', 'b', 'c']) == {'A': ACTIVE, 'B': ACTIVE, 'C': None}
+    assert backend.reads == 3
+
+
+def test_peek_never_reads_and_prefetch_fills_cache():
+    backend, cache = make_cache({'ABC': ACTIVE})
+    assert cache.peek('abc') == (False, None)
+    assert backend.reads == 0
+    cache.prefetch('abc')
+    for _ in range(100):
+        if cache.peek('ABC')[0]:
+            break
+        threading.Event().wait(0.01)
+    assert cache.peek('ABC') == (True, ACTIVE)
+    assert backend.reads == 1
@@ -0,0 +1,215 @@
+import threading
+import time
+
+import metering
+
+
+class FlakyBackend(metering.InMemoryUsageBackend):
+    """Falla en las escrituras mientras offline sea True"""
+
+    def __init__(self):
+        super().__init__()
+        self.offline = False
+
+    def add_many(self, deltas):
+        if self.offline:
+            raise ConnectionError("Error de conexión")
+        super().add_many(deltas)
+
+
+class OfflineLoadBackend(metering.InMemoryUsageBackend):
+    """Falla en las lecturas mientras offline sea True"""
+
+    def __init__(self):
+        super().__init__()
+        self.offline = False
+
+    def load(self, key, day):
+        if self.offline:
+            raise ConnectionError("Error de conexión")
+        return super().load(key, day)
+
+
+def make_meter(backend=None, **kwargs):
+    backend = backend or metering.InMemoryUsageBackend()
+    kwargs.setdefault('background', False)
+    return backend, metering.UsageMeter(backend, **kwargs)
+
+
+def test_limit_boundary():
+    backend, meter = make_meter()
+    assert meter.increment('k', limit=3) == (True, 1)
+    assert meter.increment('k', limit=3) == (True, 2)
+    assert meter.increment('k', limit=3) == (True, 3)
+    assert meter.increment('k', limit=3) == (False, 3)
+    assert meter.count('k') == 3
+
+
+def test_amount_over_remaining_is_refused_whole():
+    backend, meter = make_meter()
+    meter.increment('k', limit=3)
+    assert meter.increment('k', limit=3, amount=3) == (False, 1)
+    assert meter.increment('k', limit=3, amount=2) == (True, 3)
+
+
+def test_concurrent_increments_never_exceed_limit():
+    backend, meter = make_meter()
+    allowed = []
+
+    def worker():
+        for _ in range(100):
+            allowed.append(meter.increment('k', limit=250)[0])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(allowed) == 250
+    assert meter.count('k') == 250
+
+
+def test_first_access_loads_from_backend_once(fake_day):
+    backend, meter = make_meter(day=fake_day)
+    backend.counts[('k', '2026-01-01')] = 2
+    assert meter.count('k') == 2
+    assert meter.increment('k', limit=3) == (True, 3)
+    assert meter.increment('k', limit=3) == (False, 3)
+    assert backend.loads == 1
+
+
+def test_slow_load_does_not_block_other_keys():
+    class SlowBackend(metering.InMemoryUsageBackend):
+        def load(self, key, day):
+            if key == 'slow':
+                time.sleep(0.3)
+            return super().load(key, day)
+
+    backend, meter = make_meter(SlowBackend())
+    meter.count('fast')
+    thread = threading.Thread(target=meter.count, args=('slow',))
+    thread.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    meter.increment('fast')
+    assert time.perf_counter() - start < 0.1
+    thread.join()
+
+
+def test_day_rollover_starts_a_new_window(fake_day):
+    backend, meter = make_meter(day=fake_day)
+    for _ in range(3):
+        meter.increment('k', limit=3)
+    assert meter.increment('k', limit=3)[0] is False
+
+    fake_day.now = '2026-01-02'
+    assert meter.count('k') == 0
+    assert meter.increment('k', limit=3) == (True, 1)
+    meter.flush()
+    assert backend.counts == {('k', '2026-01-01'): 3, ('k', '2026-01-02'): 1}
+
+
+def test_increments_are_written_in_one_batch(fake_day):
+    backend, meter = make_meter(day=fake_day)
+    for key in ('a', 'b', 'a'):
+        meter.increment(key)
+    assert backend.writes == 0
+    assert meter.flush() == 2
+    assert backend.writes == 1
+    assert backend.counts == {('a', '2026-01-01'): 2, ('b', '2026-01-01'): 1}
+    assert meter.flush() == 0
+
+
+def test_failed_flush_is_requeued(fake_day):
+    backend, meter = make_meter(FlakyBackend(), day=fake_day)
+    meter.increment('k')
+    meter.increment('k')
+    backend.offline = True
+    assert meter.flush() == 0
+    assert meter.stats()['pending'] == 2
+
+    meter.increment('k')
+    backend.offline = False
+    assert meter.flush() == 1
+    assert backend.counts == {('k', '2026-01-01'): 3}
+    assert meter.stats()['pending'] == 0
+
+
+def test_background_thread_flushes_when_batch_is_full():
+    backend, meter = make_meter(flush_interval=60, flush_batch_size=5, background=True)
+    try:
+        for _ in range(5):
+            meter.increment('k')
+        deadline = time.monotonic() + 2
+        while backend.writes == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert backend.writes == 1
+    finally:
+        meter.close()
+
+
+def test_flush_splits_writes_into_batches(monkeypatch, fake_day):
+    monkeypatch.setattr(metering, 'WRITE_BATCH_SIZE', 3)
+    backend, meter = make_meter(day=fake_day)
+    for i in range(7):
+        meter.increment(f'k{i}')
+    assert meter.flush() == 7
+    assert backend.writes == 3
+
+
+def test_failed_batch_requeues_only_unwritten_slots(monkeypatch, fake_day):
+    monkeypatch.setattr(metering, 'WRITE_BATCH_SIZE', 2)
+
+    class FailsSecondBatch(metering.InMemoryUsageBackend):
+        def add_many(self, deltas):
+            if self.writes == 1:
+                self.writes += 1
+                raise ConnectionError("Error de conexión")
+            super().add_many(deltas)
+
+    backend, meter = make_meter(FailsSecondBatch(), day=fake_day)
+    for key in ('a', 'b', 'c', 'd'):
+        meter.increment(key)
+    assert meter.flush() == 2
+    assert meter.stats()['pending'] == 2
+    assert meter.flush() == 2
+    assert sorted(backend.counts.values()) == [1, 1, 1, 1]
+
+
+def test_load_timeout_does_not_hand_out_extra_quota(monkeypatch, fake_day):
+    monkeypatch.setattr(metering, 'LOAD_TIMEOUT_S', 0.05)
+    release = threading.Event()
+
+    class SlowBackend(metering.InMemoryUsageBackend):
+        def load(self, key, day):
+            release.wait(2)
+            return super().load(key, day)
+
+    backend, meter = make_meter(SlowBackend(), day=fake_day)
+    backend.counts[('k', '2026-01-01')] = 2
+    loader = threading.Thread(target=meter.count, args=('k',))
+    loader.start()
+    time.sleep(0.02)
+    # La espera se agota: se cuenta aparte desde cero
+    assert meter.increment('k', limit=3) == (True, 1)
+    assert meter.flush() == 0
+    release.set()
+    loader.join()
+    assert meter.count('k') == 3
+    assert meter.increment('k', limit=3)[0] is False
+    meter.flush()
+    assert backend.counts == {('k', '2026-01-01'): 3}
+
+
+def test_failed_load_is_retried_and_added_to_backend_value(monkeypatch, fake_day):
+    backend, meter = make_meter(OfflineLoadBackend(), day=fake_day)
+    backend.counts[('k', '2026-01-01')] = 2
+    backend.offline = True
+    assert meter.increment('k', limit=3) == (True, 1)
+    assert meter.flush() == 0
+
+    backend.offline = False
+    monkeypatch.setattr(metering, 'LOAD_RETRY_S', 0)
+    assert meter.count('k') == 3
+    assert meter.flush() == 1
+    assert backend.counts == {('k', '2026-01-01'): 3}
@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+import session_tokens
+
+SECRET = b'test-secret'
+NOW = 1_800_000_000.0
+
+
+@pytest.fixture
+def revocations(clock):
+    """Lista de revocación en memoria con reloj controlado"""
+    backend = session_tokens.InMemoryRevocations()
+    clock.now = NOW
+    revocation_list = session_tokens.set_backend(backend, sync_interval=60, clock=clock)
+    yield backend, revocation_list, clock
+    session_tokens.set_backend(session_tokens.InMemoryRevocations())
+
+
+def issue(**kwargs):
+    kwargs.setdefault('secret', SECRET)
+    kwargs.setdefault('now', NOW)
+    return session_tokens.issue('premium', 'ABC-123', '2099-12-31', **kwargs)
+
+
+def test_roundtrip_claims_without_personal_data():
+    token = issue()
+    claims = session_tokens.decode(token, SECRET, now=NOW + 10)
+    assert claims['tier'] == 'premium'
+    assert claims['code'] == 'ABC-123'
+    assert claims['exp'] == int(NOW) + session_tokens.SESSION_DAYS * 86400
+    assert 'email' not in claims and 'name' not in claims
+
+
+def test_no_secret_disables_tokens(monkeypatch):
+    monkeypatch.setattr(session_tokens, 'get_secret', lambda: None)
+    assert session_tokens.issue('premium', 'ABC', '2099-12-31') is None
+    assert session_tokens.decode('a.b') is None
+
+
+def test_tampered_payload_is_rejected():
+    payload_b64, signature_b64 = issue().split('.')
+    claims = json.loads(session_tokens._b64decode(payload_b64))
+    claims['tier'] = 'admin'
+    forged = session_tokens._b64encode(json.dumps(claims).encode('utf-8'))
+    assert session_tokens.decode(f'{forged}.{signature_b64}', SECRET, now=NOW) is None
+
+
+def test_wrong_secret_and_garbage_are_rejected():
+    token = issue()
+    assert session_tokens.decode(token, b'other-secret', now=NOW) is None
+    for garbage in ('', 'abc', 'a.b.c', '!!!.???'):
+        assert session_tokens.decode(garbage, SECRET, now=NOW) is None
+
+
+def test_expired_token_is_rejected():
+    token = issue(days=1)
+    assert session_tokens.decode(token, SECRET, now=NOW + 86399) is not None
+    assert session_tokens.decode(token, SECRET, now=NOW + 86401) is None
+
+
+def test_expired_license_is_rejected():
+    token = session_tokens.issue('premium', 'ABC', '2020-01-01', secret=SECRET, now=NOW)
+    assert session_tokens.decode(token, SECRET, now=NOW) is None
+
+
+def test_revoke_is_visible_locally(revocations):
+    token = issue()
+    assert session_tokens.verify(token, SECRET, now=NOW) is not None
+    assert session_tokens.revoke(token, SECRET)
+    assert session_tokens.verify(token, SECRET, now=NOW) is None
+
+
+def test_revocation_from_other_process_applies_after_sync(revocations):
+    backend, revocation_list, clock = revocations
+    token = issue()
+    claims = session_tokens.decode(token, SECRET, now=NOW)
+    assert session_tokens.verify(token, SECRET, now=NOW) is not None
+
+    # Otro proceso revoca el token escribiendo directamente en el backend
+    backend.add(claims['jti'], claims['exp'], clock.now + 1)
+    clock.now += 30
+    assert session_tokens.verify(token, SECRET, now=NOW) is not None
+    clock.now += 31
+    assert session_tokens.verify(token, SECRET, now=NOW) is None
+
+
+def test_sync_fetches_only_new_revocations_and_drops_expired(revocations):
+    backend, revocation_list, clock = revocations
+    revocation_list.sync()
+    backend.add('old', clock.now - 1, clock.now)
+    clock.now += 61
+    assert not revocation_list.is_revoked('old')
+    assert backend.fetches == 2
+
+
+def test_failed_sync_keeps_local_copy(revocations):
+    backend, revocation_list, clock = revocations
+    revocation_list.add('jti-1', clock.now + 3600)
+
+    def offline(since):
+        raise ConnectionError("Error de conexión")
+
+    backend.fetch_since = offline
+    clock.now += 61
+    assert revocation_list.is_revoked('jti-1')
+
+
+def test_revocations_written_during_outage_are_fetched_after_recovery(revocations):
+    backend, revocation_list, clock = revocations
+    assert not revocation_list.is_revoked('jti-2')
+    fetch_since = backend.fetch_since
+
+    def offline(since):
+        raise ConnectionError("Error de conexión")
+
+    # Otro proceso revoca el token entre dos sincronizaciones y la siguiente falla
+    clock.now += 30
+    backend.add('jti-2', clock.now + 3600, clock.now)
+    backend.fetch_since = offline
+    clock.now += 31
+    assert not revocation_list.is_revoked('jti-2')
+
+    backend.fetch_since = fetch_since
+    clock.now += 61
+    assert revocation_list.is_revoked('jti-2')
+
+
+def test_failed_first_sync_loads_full_history_later(revocations):
+    backend, revocation_list, clock = revocations
+    backend.add('old', clock.now + 3600, clock.now - 86400)
+    fetch_since = backend.fetch_since
+
+    def offline(since):
+        raise ConnectionError("Error de conexión")
+
+    backend.fetch_since = offline
+    assert not revocation_list.is_revoked('old')
+    backend.fetch_since = fetch_since
+    clock.now += 61
+    assert revocation_list.is_revoked('old')